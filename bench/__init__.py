@@ -0,0 +1 @@
+"""Benchmarks of the ICA integration against a local fake of the ICA API."""
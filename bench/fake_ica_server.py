@@ -0,0 +1,384 @@
+"""Local stand-in for the handla.api.ica.se endpoints used by the integration.
+
+The server keeps generated shopping lists, stores, offers, article groups and
+recipes in memory and applies syncs to them, so the integration can be driven
+end to end without an ICA account. Latency, error rate and data sizes are
+configurable, and every request is counted per endpoint.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import hashlib
+import json
+import random
+import uuid
+
+from aiohttp import web
+
+AUTH_TICKET = "AuthenticationTicket"
+
+PRODUCTS = [
+    "mjölk",
+    "filmjölk",
+    "smör",
+    "ost",
+    "ägg",
+    "bröd",
+    "knäckebröd",
+    "kaffe",
+    "te",
+    "välling",
+    "bananer",
+    "äpplen",
+    "potatis",
+    "lök",
+    "morötter",
+    "tomater",
+    "gurka",
+    "kycklingfilé",
+    "köttfärs",
+    "lax",
+    "pasta",
+    "ris",
+    "havregryn",
+    "yoghurt",
+    "grädde",
+    "toapapper",
+    "hushållspapper",
+    "maskindiskmedel",
+    "tvättmedel",
+    "blöjor",
+]
+
+
+@dataclass
+class FakeIcaConfig:
+    """Size and behaviour of the fake ICA API."""
+
+    lists: int = 10
+    rows: int = 30
+    stores: int = 3
+    offers: int = 500
+    article_groups: int = 20
+    latency: float = 0.05
+    latency_jitter: float = 0.02
+    error_rate: float = 0.0
+    etags: bool = True
+
+
+@dataclass
+class FakeIcaStats:
+    """Requests served by the fake ICA API."""
+
+    requests: Counter = field(default_factory=Counter)
+    errors: Counter = field(default_factory=Counter)
+    bytes_out: int = 0
+
+    def reset(self) -> None:
+        self.requests.clear()
+        self.errors.clear()
+        self.bytes_out = 0
+
+
+def _now() -> str:
+    return datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+
+class FakeIcaServer:
+    """In-memory ICA API served by aiohttp."""
+
+    def __init__(self, config: FakeIcaConfig, seed: int = 0) -> None:
+        self.config = config
+        self.stats = FakeIcaStats()
+        self._random = random.Random(seed)
+        self._tick = 0
+        self.lists: dict[str, dict] = {}
+        for n in range(config.lists):
+            offline_id = str(uuid.UUID(int=self._random.getrandbits(128)))
+            self.lists[offline_id] = {
+                "Id": n + 1,
+                "Title": f"Lista {n + 1}",
+                "CommentText": "",
+                "SortingStore": 0,
+                "Rows": [self._row(m) for m in range(config.rows)],
+                "LatestChange": self._version(),
+                "OfflineId": offline_id,
+                "IsPrivate": False,
+                "IsSmartList": False,
+            }
+        self.store_ids = [1000 + n for n in range(config.stores)]
+        self.offers = [self._offer(n) for n in range(config.offers)]
+        self.article_groups = [
+            {"Id": n + 1, "Name": f"Varugrupp {n + 1}", "ParentId": 0}
+            for n in range(config.article_groups)
+        ]
+
+    def _version(self) -> str:
+        # Monotonic even when several changes happen within the same second
+        self._tick += 1
+        return (datetime(2024, 1, 1) + timedelta(seconds=self._tick)).isoformat()
+
+    def _row(self, n: int) -> dict:
+        return {
+            "RowId": n + 1,
+            "ProductName": self._random.choice(PRODUCTS),
+            "Quantity": None,
+            "SourceId": -1,
+            "IsStrikedOver": self._random.random() < 0.2,
+            "InternalOrder": n,
+            "ArticleGroupId": self._random.randint(1, self.config.article_groups),
+            "ArticleGroupIdExtended": None,
+            "LatestChange": _now(),
+            "OfflineId": str(uuid.UUID(int=self._random.getrandbits(128))),
+            "IsSmartItem": False,
+        }
+
+    def _offer(self, n: int) -> dict:
+        product = self._random.choice(PRODUCTS)
+        store_ids = self._random.sample(
+            self.store_ids, self._random.randint(1, len(self.store_ids))
+        )
+        return {
+            "OfferId": str(100000 + n),
+            "StoreId": store_ids[0],
+            "StoreIds": store_ids,
+            "ArticleGroupId": self._random.randint(1, self.config.article_groups),
+            "OfferType": "Price",
+            "ImageUlr": f"https://example.invalid/{n}.jpg",
+            "PriceComparison": f"Jfr-pris {self._random.randint(10, 200)},00 kr/kg",
+            "SizeOrQuantiry": "ca 500 g",
+            "ProductName": f"{product.capitalize()} ICA",
+            "OfferTypeTitle": f"2 för {self._random.randint(20, 60)} kr",
+            "Disclaimer": "Max 2 köp per hushåll",
+            "OfferCondition": "",
+            "LoadedOnCard": False,
+            "OfferUsed": False,
+            "Expired": False,
+            "Articles": [
+                {"EanId": str(7300000000000 + n), "ArticleDescription": product}
+            ],
+        }
+
+    def _recipe(self, n: int) -> dict:
+        return {
+            "Id": n,
+            "Title": f"Recept {n}",
+            "ImageId": n,
+            "YouTubeId": None,
+            "IngredientGroups": [
+                {
+                    "GroupName": "",
+                    "Ingredients": [
+                        {"Text": product, "Ingredient": product}
+                        for product in self._random.sample(PRODUCTS, 8)
+                    ],
+                }
+            ],
+            "PreambleHTML": "",
+            "CurrentUserRating": None,
+            "AverageRating": 4.0,
+            "Difficulty": "Enkel",
+            "CookingTime": "30 min",
+            "Portions": 4,
+        }
+
+    def app(self) -> web.Application:
+        """Return the aiohttp application serving the fake API."""
+        app = web.Application(middlewares=[self._middleware])
+        app.add_routes(
+            [
+                web.get("/api/login", self._login),
+                web.get("/api/user/offlineshoppinglists", self._get_lists),
+                web.post("/api/user/offlineshoppinglists", self._create_list),
+                web.get("/api/user/offlineshoppinglists/{id}", self._get_list),
+                web.delete("/api/user/offlineshoppinglists/{id}", self._delete_list),
+                web.post("/api/user/offlineshoppinglists/{id}/sync", self._sync),
+                web.get("/api/user/stores", self._favorite_stores),
+                web.get("/api/user/commonarticles", self._common_articles),
+                web.get("/api/stores/{id}", self._store),
+                web.get("/api/offers", self._offers),
+                web.get("/api/articles/articlegroups", self._article_groups),
+                web.get("/api/recipes/random", self._random_recipes),
+                web.get("/api/recipes/recipe/{id}", self._recipe_by_id),
+            ]
+        )
+        return app
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        route = request.match_info.route.resource
+        name = route.canonical if route else request.path
+        self.stats.requests[name] += 1
+        delay = self.config.latency + self._random.uniform(
+            -self.config.latency_jitter, self.config.latency_jitter
+        )
+        await asyncio.sleep(max(0.0, delay))
+        if self._random.random() < self.config.error_rate:
+            self.stats.errors[name] += 1
+            raise web.HTTPInternalServerError()
+        response = await handler(request)
+        self.stats.bytes_out += response.content_length or 0
+        return response
+
+    def _json(self, data) -> web.Response:
+        return web.Response(
+            body=json.dumps(data).encode(), content_type="application/json"
+        )
+
+    def _cacheable_json(self, request: web.Request, data) -> web.Response:
+        # Offers and article groups carry an ETag when enabled
+        response = self._json(data)
+        if not self.config.etags:
+            return response
+        etag = f'"{hashlib.sha1(response.body).hexdigest()}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        return response
+
+    async def _login(self, request: web.Request) -> web.Response:
+        if "Authorization" not in request.headers:
+            raise web.HTTPUnauthorized()
+        return web.Response(headers={AUTH_TICKET: uuid.uuid4().hex})
+
+    async def _get_lists(self, request: web.Request) -> web.Response:
+        return self._json(
+            {
+                "ShoppingLists": [
+                    {
+                        "Id": x["Id"],
+                        "Title": x["Title"],
+                        "OfflineId": x["OfflineId"],
+                        "LatestChange": x["LatestChange"],
+                    }
+                    for x in self.lists.values()
+                ]
+            }
+        )
+
+    async def _get_list(self, request: web.Request) -> web.Response:
+        if (shopping_list := self.lists.get(request.match_info["id"])) is None:
+            raise web.HTTPNotFound()
+        return self._json(shopping_list)
+
+    async def _create_list(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        data["Id"] = len(self.lists) + 1
+        data["LatestChange"] = self._version()
+        self.lists[data["OfflineId"]] = data
+        return self._json(data)
+
+    async def _delete_list(self, request: web.Request) -> web.Response:
+        self.lists.pop(request.match_info["id"], None)
+        return web.Response()
+
+    async def _sync(self, request: web.Request) -> web.Response:
+        if (shopping_list := self.lists.get(request.match_info["id"])) is None:
+            raise web.HTTPNotFound()
+        data = await request.json()
+        rows = {x["OfflineId"]: x for x in shopping_list["Rows"]}
+        for row in data.get("CreatedRows", []):
+            rows[row["OfflineId"]] = {**self._row(len(rows)), **row}
+        for row in data.get("ChangedRows", []):
+            if row["OfflineId"] in rows:
+                rows[row["OfflineId"]].update(row)
+        for offline_id in data.get("DeletedRows", []):
+            rows.pop(offline_id, None)
+        if "Rows" in data and not data.keys() & {
+            "CreatedRows",
+            "ChangedRows",
+            "DeletedRows",
+        }:
+            rows = {x["OfflineId"]: x for x in data["Rows"]}
+        shopping_list["Rows"] = list(rows.values())
+        shopping_list["LatestChange"] = self._version()
+        return self._json(shopping_list)
+
+    async def _favorite_stores(self, request: web.Request) -> web.Response:
+        return self._json({"FavoriteStores": self.store_ids})
+
+    async def _common_articles(self, request: web.Request) -> web.Response:
+        return self._json(
+            {
+                "CommonArticles": [
+                    {"Id": n, "ProductName": product, "ArticleGroupId": n % 20 + 1}
+                    for n, product in enumerate(PRODUCTS)
+                ]
+            }
+        )
+
+    async def _store(self, request: web.Request) -> web.Response:
+        store_id = int(request.match_info["id"])
+        return self._json(
+            {
+                "Id": store_id,
+                "MarketingName": f"ICA Butik {store_id}",
+                "Address": {"Street": "Storgatan 1", "Zip": "11122", "City": "Ort"},
+                "Phone": "08-000000",
+                "Coordinates": {"Latitude": 59.3, "Longitude": 18.0},
+                "WebURL": None,
+                "FacebookUrl": None,
+                "FilterItems": [],
+                "ProfileId": None,
+                "OpeningHours": None,
+            }
+        )
+
+    async def _offers(self, request: web.Request) -> web.Response:
+        stores = {int(x) for x in request.query.get("Stores", "").split(",") if x}
+        return self._cacheable_json(
+            request, [x for x in self.offers if stores & set(x["StoreIds"])]
+        )
+
+    async def _article_groups(self, request: web.Request) -> web.Response:
+        return self._cacheable_json(request, self.article_groups)
+
+    async def _recipe_by_id(self, request: web.Request) -> web.Response:
+        return self._json(self._recipe(int(request.match_info["id"])))
+
+    async def _random_recipes(self, request: web.Request) -> web.Response:
+        n = int(request.query.get("numberofrecipes", 5))
+        return self._json(
+            [self._recipe(self._random.randint(1, 10000)) for _ in range(n)]
+        )
+
+
+async def start_server(
+    config: FakeIcaConfig, host: str = "127.0.0.1", port: int = 0
+) -> tuple[FakeIcaServer, web.AppRunner, str]:
+    """Start the fake API, returning the server, its runner and the base URL."""
+    server = FakeIcaServer(config)
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    port = runner.addresses[0][1]
+    return server, runner, f"http://{host}:{port}/api"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--lists", type=int, default=FakeIcaConfig.lists)
+    parser.add_argument("--rows", type=int, default=FakeIcaConfig.rows)
+    parser.add_argument("--offers", type=int, default=FakeIcaConfig.offers)
+    parser.add_argument("--latency", type=float, default=FakeIcaConfig.latency)
+    parser.add_argument("--error-rate", type=float, default=FakeIcaConfig.error_rate)
+    parser.add_argument("--no-etags", action="store_true", help="never send ETags")
+    args = parser.parse_args()
+    config = FakeIcaConfig(
+        lists=args.lists,
+        rows=args.rows,
+        offers=args.offers,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        etags=not args.no_etags,
+    )
+    web.run_app(FakeIcaServer(config).app(), port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""End-to-end benchmark of the ICA coordinator against the local fake API.
+
+Runs a cold refresh, warm refreshes with and without remote changes, a burst
+of todo edits and a bulk add through IcaShoppingListEntity, for N lists of M
+rows.
+Reports p50/p99 latency, requests per endpoint and peak allocated memory.
+
+    python -m bench.run_benchmark --lists 10 --rows 50 --iterations 20
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass, field
+from datetime import timedelta
+import json
+import logging
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import aiohttp
+from homeassistant.components.todo import TodoItem, TodoItemStatus
+from homeassistant.core import HomeAssistant
+
+from custom_components.ica.const import REFRESH_SHOPPING_LISTS
+from custom_components.ica.coordinator import IcaCoordinator
+from custom_components.ica.icaapi_async import IcaAPIAsync
+from custom_components.ica.todo import IcaShoppingListEntity
+
+from .fake_ica_server import PRODUCTS, FakeIcaConfig, FakeIcaServer, start_server
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class ScenarioResult:
+    """Measurements of one benchmark scenario."""
+
+    name: str
+    iterations: int
+    p50_ms: float
+    p99_ms: float
+    peak_kib: float
+    requests: dict[str, float] = field(default_factory=dict)
+    bytes_per_iteration: float = 0.0
+
+
+def _percentile(samples: list[float], percent: int) -> float:
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[percent - 1]
+
+
+async def _measure(
+    name: str,
+    server: FakeIcaServer,
+    iterations: int,
+    run: Callable[[], Awaitable[None]],
+    prepare: Callable[[], None] | None = None,
+) -> ScenarioResult:
+    """Time a scenario and count the requests it made."""
+    server.stats.reset()
+    samples: list[float] = []
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for _ in range(iterations):
+        if prepare:
+            prepare()
+        start = time.perf_counter()
+        await run()
+        samples.append((time.perf_counter() - start) * 1000)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    requests = Counter(server.stats.requests)
+    return ScenarioResult(
+        name=name,
+        iterations=iterations,
+        p50_ms=_percentile(samples, 50),
+        p99_ms=_percentile(samples, 99),
+        peak_kib=peak / 1024,
+        requests={k: v / iterations for k, v in sorted(requests.items())},
+        bytes_per_iteration=server.stats.bytes_out / iterations,
+    )
+
+
+async def run_benchmark(config: FakeIcaConfig, iterations: int, edits: int):
+    """Run all scenarios and return their results."""
+    server, runner, base_url = await start_server(config)
+    results: list[ScenarioResult] = []
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        async with aiohttp.ClientSession() as session:
+            api = IcaAPIAsync("190001010000", "0000", session, base_url=base_url)
+            coordinator = IcaCoordinator(
+                hass,
+                _LOGGER,
+                timedelta(minutes=1),
+                api,
+                5,
+                "benchmark",
+                refreshIntervals={REFRESH_SHOPPING_LISTS: timedelta(0)},
+            )
+            tracemalloc.start()
+
+            results.append(
+                await _measure(
+                    "cold refresh", server, 1, coordinator._async_update_data
+                )
+            )
+            results.append(
+                await _measure(
+                    "warm refresh, no changes",
+                    server,
+                    iterations,
+                    coordinator._async_update_data,
+                )
+            )
+
+            def change_one_list() -> None:
+                shopping_list = next(iter(server.lists.values()))
+                shopping_list["Rows"][0]["IsStrikedOver"] ^= True
+                shopping_list["LatestChange"] = server._version()
+
+            results.append(
+                await _measure(
+                    "warm refresh, one list changed",
+                    server,
+                    iterations,
+                    coordinator._async_update_data,
+                    change_one_list,
+                )
+            )
+
+            shopping_list = (await coordinator.async_get_shopping_lists())[0]
+            entity = IcaShoppingListEntity(
+                coordinator, "benchmark", shopping_list["Id"], shopping_list["Title"]
+            )
+
+            async def check_off_items() -> None:
+                rows = coordinator.get_shopping_list(shopping_list["Id"])["Rows"]
+                for row in rows[:edits]:
+                    await entity.async_update_todo_item(
+                        TodoItem(
+                            uid=row["OfflineId"],
+                            summary=row["ProductName"],
+                            status=TodoItemStatus.COMPLETED
+                            if not row["IsStrikedOver"]
+                            else TodoItemStatus.NEEDS_ACTION,
+                        )
+                    )
+                await coordinator.async_sync_pending_changes()
+
+            results.append(
+                await _measure(
+                    f"check off {edits} items", server, iterations, check_off_items
+                )
+            )
+
+            async def add_items() -> None:
+                await entity.async_add_items(
+                    [f"{x} {time.monotonic_ns()}" for x in PRODUCTS]
+                )
+
+            results.append(
+                await _measure(
+                    f"add {len(PRODUCTS)} items", server, iterations, add_items
+                )
+            )
+            tracemalloc.stop()
+        await hass.async_stop(force=True)
+    await runner.cleanup()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lists", type=int, default=FakeIcaConfig.lists)
+    parser.add_argument("--rows", type=int, default=FakeIcaConfig.rows)
+    parser.add_argument("--offers", type=int, default=FakeIcaConfig.offers)
+    parser.add_argument("--latency", type=float, default=FakeIcaConfig.latency)
+    parser.add_argument("--error-rate", type=float, default=FakeIcaConfig.error_rate)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--edits", type=int, default=20)
+    parser.add_argument("--no-etags", action="store_true", help="never send ETags")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+    config = FakeIcaConfig(
+        lists=args.lists,
+        rows=args.rows,
+        offers=args.offers,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        etags=not args.no_etags,
+    )
+    results = asyncio.run(run_benchmark(config, args.iterations, args.edits))
+
+    if args.json:
+        print(json.dumps([asdict(x) for x in results], indent=2))
+        return
+    for result in results:
+        print(
+            f"{result.name:<32} p50 {result.p50_ms:8.1f} ms  "
+            f"p99 {result.p99_ms:8.1f} ms  peak {result.peak_kib:9.1f} KiB  "
+            f"{result.bytes_per_iteration / 1024:8.1f} KiB in"
+        )
+        for endpoint, count in result.requests.items():
+            print(f"    {count:6.1f} x {endpoint}")
+
+
+if __name__ == "__main__":
+    main()
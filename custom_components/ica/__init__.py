@@ -1,5 +1,6 @@
 """The ica integration."""
 
+import asyncio
 import datetime
 import logging
 
@@ -8,40 +9,173 @@ import logging
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
 
+from .icaapi import IcaAuthManager
 from .icaapi_async import IcaAPIAsync
-from .coordinator import IcaCoordinator
-from .const import DOMAIN, CONF_ICA_PIN, CONF_ICA_ID, CONF_NUM_RECIPES
+from .stats import IcaRequestStats
+from .coordinator import (
+    IcaCoordinator,
+    async_get_rate_limiter,
+    queue_store,
+    snapshot_store,
+)
+from .const import (
+    DOMAIN,
+    ACCOUNT_STAGGER,
+    CONF_ICA_PIN,
+    CONF_ICA_ID,
+    CONF_NUM_RECIPES,
+    CONF_MAX_CONCURRENCY,
+    CONF_REQUEST_TIMEOUT,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_REQUEST_TIMEOUT,
+    CONF_REFRESH_INTERVAL,
+    CONF_REFRESH_JITTER,
+    DEFAULT_REFRESH_INTERVALS,
+    DEFAULT_REFRESH_JITTER,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DEFAULT_MAX_SCAN_INTERVAL,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
-SCAN_INTERVAL = datetime.timedelta(minutes=1)
+PLATFORMS: list[Platform] = [Platform.TODO, Platform.SENSOR]
 
+AUTH_STORAGE_VERSION = 1
 
-PLATFORMS: list[Platform] = [Platform.TODO]
+
+def _auth_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    return Store(hass, AUTH_STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.auth")
+
+
+async def _async_create_auth(
+    hass: HomeAssistant, entry: ConfigEntry, stats: IcaRequestStats
+) -> IcaAuthManager:
+    """Create the ticket manager, reusing the ticket stored before a restart."""
+    store = _auth_store(hass, entry)
+
+    def save_ticket(ticket: str, expires: float) -> None:
+        store.async_delay_save(lambda: {"ticket": ticket, "expires": expires}, 1)
+
+    auth = IcaAuthManager(
+        async_get_clientsession(hass),
+        entry.data[CONF_ICA_ID],
+        entry.data[CONF_ICA_PIN],
+        on_ticket=save_ticket,
+        stats=stats,
+    )
+    if data := await store.async_load():
+        auth.restore(data["ticket"], data["expires"])
+    return auth
+
+
+async def _async_staggered_refresh(
+    coordinator: IcaCoordinator, delay: float
+) -> None:
+    await asyncio.sleep(delay)
+    await coordinator.async_refresh()
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Set up ICA from a config entry."""
+    """Set up ICA from a config entry.
+
+    All accounts share Home Assistant's HTTP session and one rate limiter.
+    When an account starts from a snapshot, its first refresh runs in the
+    background, delayed by ACCOUNT_STAGGER seconds per account before it, so
+    accounts set up together do not poll together. Setup itself never waits.
+    """
+    if entry.unique_id is None:
+        hass.config_entries.async_update_entry(
+            entry, unique_id=entry.data[CONF_ICA_ID]
+        )
 
     uid = entry.data[CONF_ICA_ID]
     pin = entry.data[CONF_ICA_PIN]
     nRecipes = entry.data[CONF_NUM_RECIPES]
-    api = IcaAPIAsync(uid, pin)
-    coordinator = IcaCoordinator(hass, _LOGGER, SCAN_INTERVAL, api, nRecipes)
-    await coordinator.async_config_entry_first_refresh()
+    stats = IcaRequestStats()
+    api = IcaAPIAsync(
+        uid,
+        pin,
+        async_get_clientsession(hass),
+        await _async_create_auth(hass, entry, stats),
+        stats=stats,
+        limiter=async_get_rate_limiter(hass),
+    )
+    refreshIntervals = {
+        name: datetime.timedelta(
+            minutes=entry.options.get(CONF_REFRESH_INTERVAL.format(name), minutes)
+        )
+        for name, minutes in DEFAULT_REFRESH_INTERVALS.items()
+    }
+    coordinator = IcaCoordinator(
+        hass,
+        _LOGGER,
+        datetime.timedelta(
+            seconds=entry.options.get(CONF_MIN_SCAN_INTERVAL, DEFAULT_MIN_SCAN_INTERVAL)
+        ),
+        api,
+        nRecipes,
+        entry.entry_id,
+        maxConcurrency=entry.options.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY),
+        requestTimeout=entry.options.get(CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT),
+        refreshIntervals=refreshIntervals,
+        refreshJitter=entry.options.get(CONF_REFRESH_JITTER, DEFAULT_REFRESH_JITTER)
+        / 100,
+        maxUpdateInterval=datetime.timedelta(
+            minutes=entry.options.get(CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL)
+        ),
+    )
+    hasSnapshot = await coordinator.async_load_snapshot()
+    await coordinator.async_load_queue()
+    if hasSnapshot:
+        enabled = [
+            x
+            for x in hass.config_entries.async_entries(DOMAIN)
+            if x.disabled_by is None
+        ]
+        stagger = enabled.index(entry) * ACCOUNT_STAGGER if entry in enabled else 0
+        # Entities start from the last known data, fresh data follows shortly
+        entry.async_create_background_task(
+            hass,
+            _async_staggered_refresh(coordinator, stagger),
+            f"{DOMAIN} refresh",
+        )
+    else:
+        # The entities need the lists, which only happens once per account
+        # as the snapshot is saved after this refresh
+        await coordinator.async_config_entry_first_refresh()
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = coordinator
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
 
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
+    coordinator: IcaCoordinator = hass.data[DOMAIN][entry.entry_id]
+    await coordinator.async_sync_pending_changes()
+    await coordinator.async_shutdown()
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         hass.data[DOMAIN].pop(entry.entry_id)
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored data of a config entry."""
+    await snapshot_store(hass, entry.entry_id).async_remove()
+    await queue_store(hass, entry.entry_id).async_remove()
+    await _auth_store(hass, entry).async_remove()
+
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload ICA when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
@@ -0,0 +1,95 @@
+"""Persistent caches for slowly changing ICA data."""
+from __future__ import annotations
+
+import asyncio
+from datetime import timedelta
+import time
+from typing import Any, Generic, TypeVar
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 10
+
+_T = TypeVar("_T")
+
+
+class IcaPersistentCache(Generic[_T]):
+    """Key/value cache with a time-to-live, persisted to Home Assistant storage.
+
+    Expired entries are dropped when the cache is loaded and saved. With
+    max_entries, the least recently used entries are dropped beyond it.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        key: str,
+        ttl: timedelta,
+        max_entries: int | None = None,
+    ) -> None:
+        """Initialize the cache."""
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, key)
+        self._ttl: float = ttl.total_seconds()
+        self._max_entries = max_entries
+        self._entries: dict[str, tuple[float, _T]] = {}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    async def async_load(self) -> None:
+        """Load cached entries from storage, once, also with concurrent callers."""
+        if self._loaded:
+            return
+        async with self._lock:
+            if self._loaded:
+                return
+            data = await self._store.async_load() or {}
+            self._entries = {
+                key: (entry["fetched"], entry["value"])
+                for key, entry in data.get("entries", {}).items()
+            }
+            self._prune()
+            self._loaded = True
+
+    def _prune(self) -> None:
+        """Drop expired entries and the least recently used beyond the limit."""
+        now = time.time()
+        self._entries = {
+            key: entry
+            for key, entry in self._entries.items()
+            if now - entry[0] <= self._ttl
+        }
+        if self._max_entries is not None:
+            for key in list(self._entries)[: -self._max_entries or None]:
+                del self._entries[key]
+
+    def get(self, key: Any) -> _T | None:
+        """Return the cached value, or None if it is missing or expired."""
+        if (entry := self._entries.pop(str(key), None)) is None:
+            return None
+        fetched, value = entry
+        if time.time() - fetched > self._ttl:
+            return None
+        # Entries are kept in the order they were last used
+        self._entries[str(key)] = entry
+        return value
+
+    def set(self, key: Any, value: _T) -> None:
+        """Cache a value and schedule a save to storage."""
+        self._entries.pop(str(key), None)
+        self._entries[str(key)] = (time.time(), value)
+        if self._max_entries is not None and len(self._entries) > self._max_entries:
+            del self._entries[next(iter(self._entries))]
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the data to persist."""
+        self._prune()
+        return {
+            "entries": {
+                key: {"fetched": fetched, "value": value}
+                for key, (fetched, value) in self._entries.items()
+            }
+        }
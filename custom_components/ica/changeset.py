@@ -0,0 +1,148 @@
+"""Row operations queued for syncing an ICA shopping list."""
+from __future__ import annotations
+
+from typing import Any
+
+from .icatypes import IcaShoppingList, IcaShoppingListEntry
+
+CREATED_ROWS = "CreatedRows"
+CHANGED_ROWS = "ChangedRows"
+DELETED_ROWS = "DeletedRows"
+
+
+class IcaShoppingListChangeSet:
+    """Created, changed and deleted rows of one shopping list.
+
+    Operations are merged per row OfflineId, so editing a row several times
+    sends a single change, changing a row that is not yet synced updates the
+    created row and deleting it drops it altogether.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty change set."""
+        self._created: dict[str, IcaShoppingListEntry] = {}
+        self._changed: dict[str, dict[str, Any]] = {}
+        self._deleted: dict[str, None] = {}
+        # Fields of created rows that were edited after they were queued
+        self._edited: dict[str, set[str]] = {}
+
+    @classmethod
+    def from_shopping_list(cls, data: IcaShoppingList) -> IcaShoppingListChangeSet:
+        """Build a change set from CreatedRows/ChangedRows/DeletedRows of a list."""
+        changes = cls()
+        for row in data.get(CREATED_ROWS) or []:
+            changes.create(row)
+        for row in data.get(CHANGED_ROWS) or []:
+            changes.change(row)
+        for offline_id in data.get(DELETED_ROWS) or []:
+            changes.delete(offline_id)
+        return changes
+
+    def __bool__(self) -> bool:
+        return bool(self._created or self._changed or self._deleted)
+
+    def create(self, row: IcaShoppingListEntry) -> None:
+        """Queue a new row."""
+        self._deleted.pop(row["OfflineId"], None)
+        self._edited.pop(row["OfflineId"], None)
+        self._created[row["OfflineId"]] = dict(row)
+
+    def change(self, changes: dict[str, Any]) -> None:
+        """Queue changed fields of a row."""
+        offline_id = changes["OfflineId"]
+        if offline_id in self._created:
+            self._created[offline_id].update(changes)
+            self._edited.setdefault(offline_id, set()).update(changes)
+        else:
+            self._changed.setdefault(offline_id, {}).update(changes)
+
+    def delete(self, offline_id: str) -> None:
+        """Queue the deletion of a row."""
+        self._changed.pop(offline_id, None)
+        self._edited.pop(offline_id, None)
+        if self._created.pop(offline_id, None) is None:
+            self._deleted[offline_id] = None
+
+    def update(self, other: IcaShoppingListChangeSet) -> None:
+        """Merge operations queued after the ones in this change set."""
+        for offline_id, row in other._created.items():
+            self.create(row)
+            if edited := other._edited.get(offline_id):
+                self._edited[offline_id] = set(edited)
+        for changes in other._changed.values():
+            self.change(changes)
+        for offline_id in other._deleted:
+            self.delete(offline_id)
+
+    def apply(self, shopping_list: IcaShoppingList) -> None:
+        """Apply the operations to a cached shopping list.
+
+        Applying the same change set twice leaves the list unchanged, so
+        queued operations can be re-applied to a freshly downloaded copy.
+        """
+        rows = shopping_list["Rows"]
+        index = {x["OfflineId"]: x for x in rows}
+        for offline_id, row in self._created.items():
+            if offline_id in index:
+                index[offline_id].update(row)
+            else:
+                rows.append(dict(row))
+        for offline_id, changes in self._changed.items():
+            if offline_id in index:
+                index[offline_id].update(changes)
+        if self._deleted:
+            rows[:] = [x for x in rows if x["OfflineId"] not in self._deleted]
+
+    def reconcile(self, shopping_list: IcaShoppingList) -> None:
+        """Drop operations that a freshly downloaded list makes moot.
+
+        Created rows that already exist (an earlier sync went through but
+        its response was lost) become changes of the fields edited since they
+        were created, where these differ. Values the server assigned to the
+        other fields are kept.
+        Changes and deletions of rows that are gone are dropped, as are
+        changes the list already holds.
+        """
+        rows = {x["OfflineId"]: x for x in shopping_list["Rows"] or []}
+        for offline_id, row in list(self._created.items()):
+            if (remote := rows.get(offline_id)) is not None:
+                del self._created[offline_id]
+                edited = self._edited.pop(offline_id, set()) - {"OfflineId"}
+                if differs := {
+                    k: row[k] for k in edited if remote.get(k) != row[k]
+                }:
+                    self._changed[offline_id] = {"OfflineId": offline_id, **differs}
+        for offline_id, changes in list(self._changed.items()):
+            remote = rows.get(offline_id)
+            if remote is None or all(remote.get(k) == v for k, v in changes.items()):
+                del self._changed[offline_id]
+        for offline_id in [x for x in self._deleted if x not in rows]:
+            del self._deleted[offline_id]
+
+    def chunks(self, size: int) -> list[IcaShoppingListChangeSet]:
+        """Split the operations into change sets of at most size rows each."""
+        operations = [
+            (kind, offline_id, value)
+            for kind in ("_created", "_changed", "_deleted")
+            for offline_id, value in getattr(self, kind).items()
+        ]
+        chunks: list[IcaShoppingListChangeSet] = []
+        for start in range(0, len(operations), size):
+            chunk = IcaShoppingListChangeSet()
+            for kind, offline_id, value in operations[start : start + size]:
+                getattr(chunk, kind)[offline_id] = value
+                if kind == "_created" and offline_id in self._edited:
+                    chunk._edited[offline_id] = set(self._edited[offline_id])
+            chunks.append(chunk)
+        return chunks
+
+    def payload(self) -> dict[str, Any]:
+        """Return the sync payload holding all queued operations."""
+        payload: dict[str, Any] = {}
+        if self._created:
+            payload[CREATED_ROWS] = [dict(x) for x in self._created.values()]
+        if self._changed:
+            payload[CHANGED_ROWS] = [dict(x) for x in self._changed.values()]
+        if self._deleted:
+            payload[DELETED_ROWS] = list(self._deleted)
+        return payload
@@ -0,0 +1,127 @@
+"""Article group classification of product names."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Iterable
+from functools import lru_cache
+
+from .const import DEFAULT_ARTICLE_GROUP
+from .offers import MIN_SUFFIX_LENGTH, tokenize
+
+SOURCE_SEED = "seed"
+SOURCE_CATEGORIES = "product_categories"
+SOURCE_OFFERS = "offers"
+SOURCE_FAVORITES = "favorite_products"
+SOURCE_HISTORY = "history"
+
+# How much a name from each source counts. The user's own rows count most.
+SOURCE_WEIGHTS: dict[str, int] = {
+    SOURCE_CATEGORIES: 1,
+    SOURCE_OFFERS: 2,
+    SOURCE_SEED: 2,
+    SOURCE_FAVORITES: 4,
+    SOURCE_HISTORY: 8,
+}
+
+SEED_ARTICLE_GROUPS: dict[str, int] = {
+    "välling": 9,
+    "kaffe": 9,
+    "maskindiskmedel": 11,
+    "hushållspapper": 11,
+    "toapapper": 11,
+    "blöjor": 11,
+}
+
+CACHE_SIZE = 1024
+
+
+class IcaArticleGroupClassifier:
+    """Guess the ICA article group of a product name.
+
+    Names with a known group are collected per source (product categories,
+    offers, favorite products and the rows of the user's lists). On the first
+    lookup after a source changed they are compiled into an index of whole
+    names and of words. A name is classified by its exact match if there is
+    one, otherwise by the votes of its words. A word that is not known on its
+    own is looked up by its ending, as Swedish compound words end with what
+    the product is ("vaniljyoghurt"), and then as the beginning of a known
+    word ("mjö"). Recent lookups are cached.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the classifier with the built-in names."""
+        self._sources: dict[str, dict[str, int]] = {
+            SOURCE_SEED: dict(SEED_ARTICLE_GROUPS)
+        }
+        self._names: dict[str, int] = {}
+        self._words: dict[str, Counter[int]] = {}
+        self._sorted_words: list[str] = []
+        self._dirty = True
+        self._classify = lru_cache(maxsize=CACHE_SIZE)(self._lookup)
+
+    def update(
+        self, source: str, names: Iterable[tuple[str | None, int | None]]
+    ) -> None:
+        """Replace the names and article groups known from a source."""
+        groups = {
+            " ".join(words): group
+            for name, group in names
+            if group is not None
+            and group != DEFAULT_ARTICLE_GROUP
+            and (words := tokenize(name))
+        }
+        if groups != self._sources.get(source):
+            self._sources[source] = groups
+            self._dirty = True
+
+    def classify(self, product_name: str | None) -> int:
+        """Return the most likely article group of a product name."""
+        if self._dirty:
+            self._build()
+        return self._classify(" ".join(tokenize(product_name)))
+
+    def _build(self) -> None:
+        names: dict[str, tuple[int, int]] = {}
+        words: dict[str, Counter[int]] = {}
+        for source, groups in self._sources.items():
+            weight = SOURCE_WEIGHTS.get(source, 1)
+            for name, group in groups.items():
+                if weight > names.get(name, (0, 0))[0]:
+                    names[name] = (weight, group)
+                for word in name.split():
+                    words.setdefault(word, Counter())[group] += weight
+        self._names = {name: group for name, (_, group) in names.items()}
+        self._words = words
+        self._sorted_words = sorted(words)
+        self._classify.cache_clear()
+        self._dirty = False
+
+    def _lookup(self, name: str) -> int:
+        if not name:
+            return DEFAULT_ARTICLE_GROUP
+        if (group := self._names.get(name)) is not None:
+            return group
+        # Every word has one vote, split over the groups it was seen in
+        votes: dict[int, float] = {}
+        for word in name.split():
+            if (counts := self._word_groups(word)) is None:
+                continue
+            total = sum(counts.values())
+            for group, count in counts.items():
+                votes[group] = votes.get(group, 0.0) + count / total
+        if not votes:
+            return DEFAULT_ARTICLE_GROUP
+        return max(votes, key=votes.__getitem__)
+
+    def _word_groups(self, word: str) -> Counter[int] | None:
+        if (counts := self._words.get(word)) is not None:
+            return counts
+        for start in range(1, len(word) - MIN_SUFFIX_LENGTH + 1):
+            if (counts := self._words.get(word[start:])) is not None:
+                return counts
+        index = bisect_left(self._sorted_words, word)
+        if index < len(self._sorted_words):
+            if (known := self._sorted_words[index]).startswith(word):
+                return self._words[known]
+        return None
@@ -4,14 +4,33 @@ from http import HTTPStatus
 import logging
 from typing import Any
 
-from requests.exceptions import HTTPError
+from aiohttp import ClientError, ClientResponseError
 import voluptuous as vol
 
 from homeassistant import config_entries
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
 from .icaapi_async import IcaAPIAsync
-from .const import DOMAIN, CONF_ICA_ID, CONF_ICA_PIN, CONF_NUM_RECIPES
+from .const import (
+    DOMAIN,
+    CONF_ICA_ID,
+    CONF_ICA_PIN,
+    CONF_NUM_RECIPES,
+    CONF_MAX_CONCURRENCY,
+    CONF_REQUEST_TIMEOUT,
+    CONF_REFRESH_INTERVAL,
+    CONF_REFRESH_JITTER,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_MAX_SCAN_INTERVAL,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_REFRESH_INTERVALS,
+    DEFAULT_REFRESH_JITTER,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DEFAULT_MAX_SCAN_INTERVAL,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -32,24 +51,37 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> config_entries.OptionsFlow:
+        """Create the options flow."""
+        return OptionsFlowHandler(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Handle the initial step."""
-        if self._async_current_entries():
-            return self.async_abort(reason="single_instance_allowed")
-
         errors: dict[str, str] = {}
         if user_input is not None:
-            api = IcaAPIAsync(user_input[CONF_ICA_ID], user_input[CONF_ICA_PIN])
+            await self.async_set_unique_id(user_input[CONF_ICA_ID])
+            self._abort_if_unique_id_configured()
+            api = IcaAPIAsync(
+                user_input[CONF_ICA_ID],
+                user_input[CONF_ICA_PIN],
+                async_get_clientsession(self.hass),
+            )
             nRecipes = user_input[CONF_NUM_RECIPES]
             try:
                 await api.get_shopping_lists()
-            except HTTPError as err:
-                if err.response.status_code == HTTPStatus.UNAUTHORIZED:
+            except ClientResponseError as err:
+                if err.status == HTTPStatus.UNAUTHORIZED:
                     errors["base"] = "invalid_credentials"
                 else:
                     errors["base"] = "cannot_connect"
+            except ClientError:
+                errors["base"] = "cannot_connect"
             except Exception:  # pylint: disable=broad-except
                 _LOGGER.exception("Unexpected exception")
                 errors["base"] = "unknown"
@@ -61,3 +93,51 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             data_schema=STEP_USER_DATA_SCHEMA,
             errors=errors,
         )
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle ICA options."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize ICA options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the ICA options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        schema: dict[Any, Any] = {
+            vol.Optional(
+                CONF_MAX_CONCURRENCY,
+                default=options.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY),
+            ): vol.All(int, vol.Range(min=1)),
+            vol.Optional(
+                CONF_REQUEST_TIMEOUT,
+                default=options.get(CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT),
+            ): vol.All(int, vol.Range(min=1)),
+            vol.Optional(
+                CONF_MIN_SCAN_INTERVAL,
+                default=options.get(CONF_MIN_SCAN_INTERVAL, DEFAULT_MIN_SCAN_INTERVAL),
+            ): vol.All(int, vol.Range(min=5)),
+            vol.Optional(
+                CONF_MAX_SCAN_INTERVAL,
+                default=options.get(CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL),
+            ): vol.All(int, vol.Range(min=1)),
+        }
+        for name, minutes in DEFAULT_REFRESH_INTERVALS.items():
+            key = CONF_REFRESH_INTERVAL.format(name)
+            schema[vol.Optional(key, default=options.get(key, minutes))] = vol.All(
+                int, vol.Range(min=1)
+            )
+        schema[
+            vol.Optional(
+                CONF_REFRESH_JITTER,
+                default=options.get(CONF_REFRESH_JITTER, DEFAULT_REFRESH_JITTER),
+            )
+        ] = vol.All(int, vol.Range(min=0, max=100))
+
+        return self.async_show_form(step_id="init", data_schema=vol.Schema(schema))
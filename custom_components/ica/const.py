@@ -1,4 +1,5 @@
 """Constants for the ICA component."""
+from datetime import timedelta
 from typing import Final
 
 CONF_EXTRA_PROJECTS: Final = "custom_projects"
@@ -74,6 +75,11 @@ ASSIGNEE: Final = "assignee"
 COLLABORATORS: Final = "collaborators"
 
 SERVICE_NEW_TASK: Final = "new_task"
+SERVICE_ADD_ITEMS: Final = "add_items"
+# Service Call: Product names to add to a shopping list
+ATTR_ITEMS: Final = "items"
+# Service Call: Recipe whose ingredients are added to a shopping list
+ATTR_RECIPE_ID: Final = "recipe_id"
 
 
 """Constants for ICA shopping list"""
@@ -82,7 +88,68 @@ DOMAIN: Final = "ica"
 CONF_ICA_ID: Final = "personal_id"
 CONF_ICA_PIN: Final = "pin_code"
 CONF_NUM_RECIPES: Final = "recipe_count"
+CONF_MAX_CONCURRENCY: Final = "max_concurrency"
+CONF_REQUEST_TIMEOUT: Final = "request_timeout"
+DEFAULT_MAX_CONCURRENCY: Final = 4
+DEFAULT_REQUEST_TIMEOUT: Final = 10
+STORE_CACHE_TTL: Final = timedelta(days=1)
+RECIPE_CACHE_TTL: Final = timedelta(days=30)
+RECIPE_CACHE_SIZE: Final = 200
+# Random recipes are fetched this many at a time, and the recipes shown
+# move on to the next recipe_count of them every RECIPE_ROTATION
+RECIPE_POOL_FACTOR: Final = 7
+RECIPE_ROTATION: Final = timedelta(days=1)
+# Requests per second to the ICA API, and burst size, over all accounts
+UPSTREAM_RATE_LIMIT: Final = 5
+UPSTREAM_BURST: Final = 10
+# Seconds between the first refreshes of consecutive accounts
+ACCOUNT_STAGGER: Final = 7
+
+# Article group of rows that cannot be classified
+DEFAULT_ARTICLE_GROUP: Final = 12
+# Seconds to wait before writing a changed snapshot of the ICA data to disk
+SNAPSHOT_SAVE_DELAY: Final = 30
+# Seconds to collect local edits of a shopping list before syncing them
+SYNC_DELAY: Final = 3
+# Most row operations sent in one sync request
+MAX_SYNC_ROWS: Final = 50
+# Seconds to wait before writing changed queued edits to disk
+QUEUE_SAVE_DELAY: Final = 1
+# Bounds of the backoff between retries of a failed sync
+SYNC_RETRY_MIN: Final = timedelta(seconds=10)
+SYNC_RETRY_MAX: Final = timedelta(minutes=15)
+
+# Bounds of the backoff between retries of a failed refresh of a data class
+REFRESH_RETRY_MIN: Final = timedelta(minutes=1)
+REFRESH_RETRY_MAX: Final = timedelta(hours=1)
+
+REFRESH_SHOPPING_LISTS: Final = "shopping_lists"
+REFRESH_OFFERS: Final = "offers"
+REFRESH_RECIPES: Final = "recipes"
+REFRESH_STORES: Final = "stores"
+REFRESH_PRODUCT_CATEGORIES: Final = "product_categories"
+# Options: refresh interval in minutes per data class, e.g. "offers_interval"
+CONF_REFRESH_INTERVAL: Final = "{}_interval"
+DEFAULT_REFRESH_INTERVALS: Final = {
+    REFRESH_OFFERS: 6 * 60,
+    REFRESH_RECIPES: 7 * 24 * 60,
+    REFRESH_STORES: 24 * 60,
+    REFRESH_PRODUCT_CATEGORIES: 7 * 24 * 60,
+}
+# Options: random delay added to each refresh, in percent of the interval
+CONF_REFRESH_JITTER: Final = "refresh_jitter"
+DEFAULT_REFRESH_JITTER: Final = 10
+
+# Shopping lists are polled between these intervals, fastest after changes
+CONF_MIN_SCAN_INTERVAL: Final = "min_scan_interval"
+CONF_MAX_SCAN_INTERVAL: Final = "max_scan_interval"
+DEFAULT_MIN_SCAN_INTERVAL: Final = 20
+DEFAULT_MAX_SCAN_INTERVAL: Final = 15
+# How long polling stays fast after the last change of a list
+SCAN_ACTIVE_PERIOD: Final = timedelta(minutes=5)
 AUTH_TICKET: Final = "AuthenticationTicket"
+AUTH_TICKET_LIFETIME: Final = timedelta(hours=4)
+AUTH_TICKET_REFRESH_MARGIN: Final = timedelta(minutes=5)
 GET_LISTS: Final = "ShoppingLists"
 LIST_NAME: Final = "Title"
 ITEM_LIST: Final = "Rows"
@@ -104,5 +171,5 @@ STORE_ENDPOINT: Final = "stores/{}"
 STORE_SEARCH_ENDPOINT: Final = "stores/search?Filters&Phrase={}"
 OFFERS_ENDPOINT: Final = "offers?Stores={}"
 ARTICLEGROUPS_ENDPOINT: Final = "articles/articlegroups?lastsyncdate={}"
-RECIPE_ENDPOINT: Final = "recipe"
+RECIPE_ENDPOINT: Final = "recipes/recipe/{}"
 RANDOM_RECIPES_ENDPOINT: Final = "recipes/random?numberofrecipes={}"
@@ -1,19 +1,118 @@
 """DataUpdateCoordinator for the Todoist component."""
+import asyncio
+from collections.abc import Awaitable, Callable
 from datetime import timedelta
+from functools import partial
 import logging
+import time
+from typing import Any
 
-from homeassistant.core import HomeAssistant
+from aiohttp import ClientResponseError
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.singleton import singleton
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
+from .cache import IcaPersistentCache
+from .changeset import IcaShoppingListChangeSet
+from .classifier import (
+    SOURCE_CATEGORIES,
+    SOURCE_FAVORITES,
+    SOURCE_HISTORY,
+    SOURCE_OFFERS,
+    IcaArticleGroupClassifier,
+)
+from .const import (
+    DOMAIN,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_REFRESH_INTERVALS,
+    DEFAULT_REFRESH_JITTER,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    REFRESH_SHOPPING_LISTS,
+    REFRESH_OFFERS,
+    REFRESH_RECIPES,
+    REFRESH_STORES,
+    REFRESH_PRODUCT_CATEGORIES,
+    REFRESH_RETRY_MAX,
+    REFRESH_RETRY_MIN,
+    STORE_CACHE_TTL,
+    RECIPE_CACHE_SIZE,
+    RECIPE_CACHE_TTL,
+    RECIPE_POOL_FACTOR,
+    RECIPE_ROTATION,
+    UPSTREAM_BURST,
+    UPSTREAM_RATE_LIMIT,
+    MAX_SYNC_ROWS,
+    QUEUE_SAVE_DELAY,
+    SCAN_ACTIVE_PERIOD,
+    SNAPSHOT_SAVE_DELAY,
+    SYNC_DELAY,
+    SYNC_RETRY_MAX,
+    SYNC_RETRY_MIN,
+)
 from .icaapi_async import IcaAPIAsync
 from .icatypes import (
+    IcaCommonArticle,
     IcaStore,
     IcaProductCategory,
     IcaRecipe,
     IcaShoppingListEntry,
-    IcaOffer,
     IcaShoppingList,
 )
+from .models import IcaOfferModel, IcaStoreModel, decode_offers
+from .offers import IcaOfferIndex, IcaOfferShards, describe_offers
+from .ratelimit import IcaRateLimiter
+from .scheduler import IcaAdaptiveInterval, IcaBackoff, IcaRefreshScheduler
+from .sorting import article_group_ranks, move_changes, sort_rows
+
+SNAPSHOT_VERSION = 1
+QUEUE_VERSION = 1
+
+
+def snapshot_store(hass: HomeAssistant, entryId: str) -> Store[dict[str, Any]]:
+    """Return the store holding the data snapshot of a config entry."""
+    return Store(hass, SNAPSHOT_VERSION, f"{DOMAIN}.{entryId}.snapshot")
+
+
+def queue_store(hass: HomeAssistant, entryId: str) -> Store[dict[str, Any]]:
+    """Return the store holding the edits of a config entry not yet synced."""
+    return Store(hass, QUEUE_VERSION, f"{DOMAIN}.{entryId}.queue")
+
+
+@singleton(f"{DOMAIN}_rate_limiter")
+@callback
+def async_get_rate_limiter(hass: HomeAssistant) -> IcaRateLimiter:
+    """Return the rate limiter shared by all ICA accounts."""
+    return IcaRateLimiter(UPSTREAM_RATE_LIMIT, UPSTREAM_BURST)
+
+
+@singleton(f"{DOMAIN}_store_cache")
+@callback
+def async_get_store_cache(hass: HomeAssistant) -> IcaPersistentCache[IcaStore]:
+    """Return the cache of store details shared by all ICA accounts."""
+    return IcaPersistentCache(hass, f"{DOMAIN}.stores", STORE_CACHE_TTL)
+
+
+@singleton(f"{DOMAIN}_recipe_cache")
+@callback
+def async_get_recipe_cache(hass: HomeAssistant) -> IcaPersistentCache[IcaRecipe]:
+    """Return the cache of recipes by Id shared by all ICA accounts."""
+    return IcaPersistentCache(
+        hass, f"{DOMAIN}.recipes", RECIPE_CACHE_TTL, RECIPE_CACHE_SIZE
+    )
+
+
+def _is_rejected(err: Exception) -> bool:
+    """Return True if ICA refused a request and retrying will not help."""
+    return (
+        isinstance(err, ClientResponseError)
+        and 400 <= err.status < 500
+        and err.status not in (401, 408, 429)
+    )
 
 
 class IcaCoordinator(DataUpdateCoordinator[list[IcaShoppingListEntry]]):
@@ -26,84 +125,757 @@ class IcaCoordinator(DataUpdateCoordinator[list[IcaShoppingListEntry]]):
         update_interval: timedelta,
         api: IcaAPIAsync,
         nRecipes: int,
+        entryId: str,
+        maxConcurrency: int = DEFAULT_MAX_CONCURRENCY,
+        requestTimeout: float = DEFAULT_REQUEST_TIMEOUT,
+        refreshIntervals: dict[str, timedelta] | None = None,
+        refreshJitter: float = DEFAULT_REFRESH_JITTER / 100,
+        maxUpdateInterval: timedelta = timedelta(minutes=DEFAULT_MAX_SCAN_INTERVAL),
     ) -> None:
-        """Initialize the ICA coordinator."""
+        """Initialize the ICA coordinator.
+
+        The shopping lists are polled every update_interval while they are
+        changing, backing off to maxUpdateInterval while they are idle.
+        """
         super().__init__(hass, logger, name="ICA", update_interval=update_interval)
         self.api = api
+        self._pollInterval = IcaAdaptiveInterval(
+            update_interval, maxUpdateInterval, SCAN_ACTIVE_PERIOD, refreshJitter
+        )
+        self._listsChanged = False
         self._nRecipes: int = nRecipes
-        self._stores: list[IcaStore] | None = None
+        self._maxConcurrency: int = maxConcurrency
+        self._requestTimeout: float = requestTimeout
+        self._staleLists: set[str] = set()
+        self._listVersions: dict[str, str | None] = {}
+        self._semaphore = asyncio.Semaphore(maxConcurrency)
+        # Shopping lists are fetched on every update, at the adaptive interval
+        intervals = {REFRESH_SHOPPING_LISTS: timedelta(0)}
+        intervals.update(
+            (name, timedelta(minutes=minutes))
+            for name, minutes in DEFAULT_REFRESH_INTERVALS.items()
+        )
+        intervals.update(refreshIntervals or {})
+        jitter = {name: refreshJitter for name in intervals}
+        jitter[REFRESH_SHOPPING_LISTS] = 0.0
+        self._scheduler = IcaRefreshScheduler(intervals, jitter)
+        self._refreshBackoff = IcaBackoff(REFRESH_RETRY_MIN, REFRESH_RETRY_MAX)
+        self._stores: list[IcaStoreModel] | None = None
+        self._storeCache = async_get_store_cache(hass)
         self._productCategories: list[IcaProductCategory] | None = None
-        self._icaOffers: list[IcaOffer] | None = None
+        self._groupRanks: dict[int, int] = {}
+        self._favoriteProducts: list[IcaCommonArticle] | None = None
+        self._classifier = IcaArticleGroupClassifier()
+        self._icaOffers: list[IcaOfferModel] | None = None
+        self._offerShards = IcaOfferShards()
+        self._offerIndex = IcaOfferIndex()
         self._icaShoppingLists: list[IcaShoppingList] | None = None
         self._icaRecipes: list[IcaRecipe] | None = None
+        self._recipeCache = async_get_recipe_cache(hass)
+        self._listsById: dict[int, IcaShoppingList] = {}
+        self._listsByOfflineId: dict[str, IcaShoppingList] = {}
+        self._rowsByOfflineId: dict[str, dict[str, IcaShoppingListEntry]] = {}
+        self._pendingChanges: dict[str, IcaShoppingListChangeSet] = {}
+        self._syncDebouncers: dict[str, Debouncer] = {}
+        self._syncBackoff = IcaBackoff(SYNC_RETRY_MIN, SYNC_RETRY_MAX)
+        self._syncRetries: dict[str, CALLBACK_TYPE] = {}
+        self._snapshotStore = snapshot_store(hass, entryId)
+        self._queueStore = queue_store(hass, entryId)
 
     def get_shopping_list(self, list_id) -> IcaShoppingList:
-        # await self.async_get_shopping_lists()
-        for x in filter(lambda x: x["Id"] == list_id, self._icaShoppingLists):
-            return x
-        return None
+        return self._listsById.get(list_id)
 
-    def get_article_group(self, productName) -> int:
-        # await self.async_get_product_categories()
-        # for x in filter(lambda x: x["Id"] == list_id, self._icaShoppingLists):
-        #    return x
-        articleGroups = {
-            "välling": 9,
-            "kaffe": 9,
-            "maskindiskmedel": 11,
-            "hushållspapper": 11,
-            "toapapper": 11,
-            "blöjor": 11,
+    def _get_shopping_list_by_offline_id(self, offline_id) -> IcaShoppingList:
+        return self._listsByOfflineId.get(offline_id)
+
+    def get_row(
+        self, shopping_list: IcaShoppingList, offline_id: str
+    ) -> IcaShoppingListEntry | None:
+        """Return the row of a shopping list with the given OfflineId."""
+        return self._rowsByOfflineId.get(shopping_list["OfflineId"], {}).get(
+            offline_id
+        )
+
+    def _index_shopping_list(self, shopping_list: IcaShoppingList) -> None:
+        """Add or update a shopping list and its rows in the lookup indexes."""
+        if shopping_list.get("Rows") is None:
+            shopping_list["Rows"] = []
+        if indexed := self._listsByOfflineId.get(shopping_list["OfflineId"]):
+            self._listsById.pop(indexed["Id"], None)
+        self._listsById[shopping_list["Id"]] = shopping_list
+        self._listsByOfflineId[shopping_list["OfflineId"]] = shopping_list
+        self._rowsByOfflineId[shopping_list["OfflineId"]] = {
+            x["OfflineId"]: x for x in shopping_list["Rows"] or []
         }
 
-        return articleGroups.get(str.lower(productName), 12)
+    def _unindex_shopping_list(self, shopping_list: IcaShoppingList) -> None:
+        """Remove a shopping list and its rows from the lookup indexes."""
+        self._listsById.pop(shopping_list["Id"], None)
+        self._listsByOfflineId.pop(shopping_list["OfflineId"], None)
+        self._rowsByOfflineId.pop(shopping_list["OfflineId"], None)
+
+    @property
+    def shopping_lists(self) -> list[IcaShoppingList]:
+        """Return the cached shopping lists."""
+        return self._icaShoppingLists or []
+
+    @property
+    def pending_changes(self) -> dict[str, dict[str, Any]]:
+        """Return the queued sync payloads per shopping list OfflineId."""
+        return {k: v.payload() for k, v in self._pendingChanges.items() if v}
+
+    def is_shopping_list_stale(self, shopping_list: IcaShoppingList) -> bool:
+        """Return True if the last refresh of the list failed and it holds old data."""
+        return shopping_list["OfflineId"] in self._staleLists
+
+    def _set_offers(self, offers: list[IcaOfferModel] | None) -> None:
+        """Store the offers and index them, unless they did not change."""
+        if offers is self._offerIndex.offers or offers == self._offerIndex.offers:
+            self._icaOffers = self._offerIndex.offers
+            return
+        self._icaOffers = offers
+        self._offerIndex = IcaOfferIndex(offers)
+        self._classifier.update(
+            SOURCE_OFFERS,
+            ((x.product_name, x.article_group_id) for x in offers or []),
+        )
+
+    def _set_product_categories(
+        self, categories: list[IcaProductCategory] | None
+    ) -> None:
+        self._productCategories = categories
+        self._groupRanks = article_group_ranks(categories)
+        self._classifier.update(
+            SOURCE_CATEGORIES, ((x["Name"], x["Id"]) for x in categories or [])
+        )
+
+    def _set_favorite_products(self, products: list[IcaCommonArticle] | None) -> None:
+        self._favoriteProducts = products
+        self._classifier.update(
+            SOURCE_FAVORITES,
+            ((x["ProductName"], x["ArticleGroupId"]) for x in products or []),
+        )
+
+    def _update_classifier_history(self) -> None:
+        """Learn article groups from the rows of the user's shopping lists."""
+        self._classifier.update(
+            SOURCE_HISTORY,
+            (
+                (row["ProductName"], row["ArticleGroupId"])
+                for shopping_list in self._listsById.values()
+                for row in shopping_list["Rows"] or []
+            ),
+        )
+
+    def get_row_offers(
+        self, row: IcaShoppingListEntry
+    ) -> tuple[IcaOfferModel, ...]:
+        """Return the offers at the favorite stores that match a row."""
+        return self._offerIndex.match(row["ProductName"], row.get("ArticleGroupId"))
+
+    def get_row_description(self, row: IcaShoppingListEntry) -> str | None:
+        """Return a description of the offers matching a row, if any."""
+        return describe_offers(self.get_row_offers(row))
+
+    def get_article_group(self, productName) -> int:
+        """Return the article group of a product, without any network call."""
+        return self._classifier.classify(productName)
 
     async def _async_update_data(self) -> None:  # list[IcaShoppingListEntry]:
-        """Fetch shopping lists from the ICA API."""
-        self._icaShoppingLists = None
-        self._icaRecipes = None
-        self._icaOffers = None
+        """Refresh the ICA data, record how long it took and adapt the interval."""
+        start = time.perf_counter()
+        success = False
+        self._listsChanged = False
+        try:
+            await self._async_refresh_due_data()
+            success = True
+        finally:
+            self.api.stats.record_refresh((time.perf_counter() - start) * 1000, success)
+            self.update_interval = self._pollInterval.next_interval(self._listsChanged)
+
+    async def _async_refresh_due_data(self) -> None:
+        """Fetch the ICA data classes that are due for a refresh.
+
+        Shopping lists are the primary data and a failure to fetch them fails
+        the update. Stores, offers, recipes and product categories refresh on
+        their own, much slower, schedules and a failure only postpones them to
+        the next update.
+        """
+        if self._scheduler.is_due(REFRESH_SHOPPING_LISTS):
+            try:
+                await self._async_update_shopping_lists()
+            except Exception as err:
+                raise UpdateFailed(f"Error communicating with API: {err}") from err
+            for offline_id, changes in self._pendingChanges.items():
+                if shopping_list := self._get_shopping_list_by_offline_id(offline_id):
+                    changes.apply(shopping_list)
+                    self._index_shopping_list(shopping_list)
+            self._scheduler.mark_refreshed(REFRESH_SHOPPING_LISTS)
+            self._async_resume_sync_retries()
+
+        await self._async_refresh_if_due(REFRESH_STORES, self._async_refresh_stores)
+        await self._async_refresh_if_due(REFRESH_OFFERS, self._async_refresh_offers)
+        if self._nRecipes:
+            await self._async_refresh_if_due(
+                REFRESH_RECIPES, self._async_refresh_recipes
+            )
+        await self._async_refresh_if_due(
+            REFRESH_PRODUCT_CATEGORIES, self._async_refresh_product_categories
+        )
+
+    async def _async_refresh_if_due(
+        self, name: str, refresh: Callable[[], Awaitable[None]]
+    ) -> None:
+        """Run the refresh of a data class if its schedule says it is due.
+
+        A failed refresh is retried with exponential backoff rather than on
+        every poll of the shopping lists.
+        """
+        if not self._scheduler.is_due(name):
+            return
         try:
-            self._icaShoppingLists = await self.async_get_shopping_lists()
-            self._icaOffers = await self.async_get_offers()
-            if self._nRecipes:
-                self._icaRecipes = await self.async_get_recipes(self._nRecipes)
-        except Exception as err:
-            raise UpdateFailed(f"Error communicating with API: {err}") from err
+            await refresh()
+        except Exception as err:  # pylint: disable=broad-except
+            delay = self._scheduler.mark_failed(
+                name, self._refreshBackoff.next_delay(name)
+            )
+            self.logger.warning(
+                "Error refreshing ICA %s, retrying in %.0f s: %s", name, delay, err
+            )
+            return
+        self._refreshBackoff.reset(name)
+        self._scheduler.mark_refreshed(name)
+        self._async_schedule_snapshot_save()
+
+    async def _async_refresh_stores(self) -> None:
+        self._stores = await self._async_fetch_stores()
+        if self._icaOffers is None:
+            return
+        # Only the offers of stores that became favorites are fetched now
+        storeIds = [s.id for s in self._stores]
+        loaded = set(self._offerShards.store_ids)
+        added = [x for x in storeIds if x not in loaded]
+        if added or loaded - set(storeIds):
+            await self._async_update_offer_shards(storeIds, added)
+
+    async def _async_refresh_offers(self) -> None:
+        storeIds = [s.id for s in await self.async_get_stores()]
+        await self._async_update_offer_shards(storeIds, storeIds)
+
+    async def _async_update_offer_shards(
+        self, storeIds: list[int], fetchIds: list[int]
+    ) -> None:
+        """Fetch the offers of some stores and drop those of former favorites.
+
+        The offers of a store that could not be fetched are kept as they were.
+        """
+        results = await asyncio.gather(*[self._async_fetch_offers(x) for x in fetchIds])
+        for store_id, offers in zip(fetchIds, results):
+            if offers is not None:
+                self._offerShards.update(store_id, offers)
+        # Former favorites also lose the response kept for conditional requests
+        for store_id in set(self._offerShards.store_ids) - set(storeIds):
+            self.api.forget_offers([store_id])
+        self._offerShards.retain(storeIds)
+        self._set_offers(self._offerShards.offers())
+        if fetchIds and all(x is None for x in results):
+            raise UpdateFailed("No store offers could be fetched")
+
+    async def _async_fetch_offers(self, storeId: int) -> list[IcaOfferModel] | None:
+        """Fetch the offers of a single store, or None if that failed."""
+        try:
+            async with self._semaphore:
+                async with asyncio.timeout(self._requestTimeout):
+                    return await self.api.get_offers([storeId])
+        except Exception as err:  # pylint: disable=broad-except
+            self.logger.warning(
+                "Error fetching ICA offers of store %s: %s", storeId, err
+            )
+            return None
+
+    async def _async_refresh_recipes(self) -> None:
+        """Fetch a pool of random recipes that is rotated between refreshes."""
+        await self._recipeCache.async_load()
+        recipes = await self.api.get_random_recipes(
+            self._nRecipes * RECIPE_POOL_FACTOR
+        )
+        for recipe in recipes:
+            self._recipeCache.set(recipe["Id"], recipe)
+        self._icaRecipes = recipes
+
+    async def _async_refresh_product_categories(self) -> None:
+        self._set_product_categories(await self.api.get_product_categories())
+        self._set_favorite_products(await self.api.get_favorite_products())
+
+    async def async_load_snapshot(self) -> bool:
+        """Restore the data of the last successful refresh from disk.
+
+        Returns True if a snapshot was found. Data classes refreshed shortly
+        before the snapshot was taken are not due again until their interval
+        has passed.
+        """
+        if not (data := await self._snapshotStore.async_load()):
+            return False
+        for shopping_list in data["shopping_lists"]:
+            self._index_shopping_list(shopping_list)
+        self._icaShoppingLists = data["shopping_lists"]
+        self._listVersions = data["list_versions"]
+        self._stores = [IcaStoreModel.from_json(x) for x in data["stores"] or []]
+        if isinstance(data["offers"], list):
+            # Snapshots from before offers were kept per store
+            self._set_offers(decode_offers(data["offers"]))
+        else:
+            self._offerShards = IcaOfferShards.from_json(data["offers"])
+            self._set_offers(self._offerShards.offers())
+        self._icaRecipes = data["recipes"]
+        self._set_product_categories(data["product_categories"])
+        self._set_favorite_products(data.get("favorite_products"))
+        self._update_classifier_history()
+        self._scheduler.restore(data["refreshed"])
+        self._staleLists = set(self._listsByOfflineId)
+        return True
+
+    async def async_load_queue(self) -> None:
+        """Restore the edits that were not synced before a restart.
+
+        They are applied to the cached lists and sent after a short delay,
+        staggered per list.
+        """
+        if not (data := await self._queueStore.async_load()):
+            return
+        for offline_id, payload in data["changes"].items():
+            changes = IcaShoppingListChangeSet.from_shopping_list(payload)
+            if not changes:
+                continue
+            self._pendingChanges[offline_id] = changes
+            if shopping_list := self._get_shopping_list_by_offline_id(offline_id):
+                changes.apply(shopping_list)
+                self._index_shopping_list(shopping_list)
+            self._async_schedule_sync_retry(offline_id)
+
+    @callback
+    def _async_schedule_queue_save(self) -> None:
+        self._queueStore.async_delay_save(self._queue_data, QUEUE_SAVE_DELAY)
+
+    @callback
+    def _queue_data(self) -> dict[str, Any]:
+        """Return the queued edits to persist."""
+        return {"changes": self.pending_changes}
+
+    @callback
+    def _async_schedule_snapshot_save(self) -> None:
+        self._snapshotStore.async_delay_save(self._snapshot_data, SNAPSHOT_SAVE_DELAY)
+
+    @callback
+    def _snapshot_data(self) -> dict[str, Any]:
+        """Return the snapshot to persist."""
+        return {
+            "shopping_lists": self._icaShoppingLists or [],
+            "list_versions": self._listVersions,
+            "stores": [x.as_json() for x in self._stores or []],
+            "offers": self._offerShards.as_json(),
+            "recipes": self._icaRecipes,
+            "product_categories": self._productCategories,
+            "favorite_products": self._favoriteProducts,
+            "refreshed": self._scheduler.refreshed_at(),
+        }
+
+    async def async_refresh_shopping_lists(self) -> None:
+        """Refresh the shopping lists right away, regardless of their schedule."""
+        self._scheduler.invalidate(REFRESH_SHOPPING_LISTS)
+        await self.async_refresh()
+
+    async def async_create_row(
+        self, shopping_list: IcaShoppingList, row: IcaShoppingListEntry
+    ) -> None:
+        """Add a row locally and queue it for syncing."""
+        changes = IcaShoppingListChangeSet()
+        changes.create(row)
+        await self._async_queue_changes(shopping_list, changes)
+
+    async def async_create_rows(
+        self, shopping_list: IcaShoppingList, rows: list[IcaShoppingListEntry]
+    ) -> None:
+        """Add many rows locally and sync them right away, with one refresh."""
+        changes = IcaShoppingListChangeSet()
+        for row in rows:
+            changes.create(row)
+        await self._async_queue_changes(shopping_list, changes, immediate=True)
+
+    def get_sorted_rows(
+        self, shopping_list: IcaShoppingList
+    ) -> list[IcaShoppingListEntry]:
+        """Return the rows of a list in the order they are shown.
+
+        Lists sorted by a store are ordered by article group, in the order of
+        the product categories, and by InternalOrder within a group.
+        """
+        return sort_rows(
+            shopping_list["Rows"] or [],
+            self._groupRanks if shopping_list.get("SortingStore") else None,
+        )
+
+    async def async_move_row(
+        self,
+        shopping_list: IcaShoppingList,
+        offline_id: str,
+        previous_offline_id: str | None,
+    ) -> None:
+        """Move a row after another, or first, and queue the changed orders."""
+        changes = IcaShoppingListChangeSet()
+        for row_changes in move_changes(
+            self.get_sorted_rows(shopping_list),
+            offline_id,
+            previous_offline_id,
+            by_group=bool(shopping_list.get("SortingStore")),
+        ):
+            changes.change(row_changes)
+        if changes:
+            await self._async_queue_changes(shopping_list, changes)
+
+    async def async_change_row(
+        self, shopping_list: IcaShoppingList, row_changes: dict[str, Any]
+    ) -> None:
+        """Change a row locally and queue the change for syncing."""
+        changes = IcaShoppingListChangeSet()
+        changes.change(row_changes)
+        await self._async_queue_changes(shopping_list, changes)
+
+    async def async_delete_rows(
+        self, shopping_list: IcaShoppingList, offline_ids: list[str]
+    ) -> None:
+        """Delete rows locally and queue the deletion for syncing."""
+        changes = IcaShoppingListChangeSet()
+        for offline_id in offline_ids:
+            changes.delete(offline_id)
+        await self._async_queue_changes(shopping_list, changes)
+
+    async def _async_queue_changes(
+        self,
+        shopping_list: IcaShoppingList,
+        changes: IcaShoppingListChangeSet,
+        immediate: bool = False,
+    ) -> None:
+        """Apply changes to the cached list right away and sync them shortly.
+
+        Changes made to the same list within SYNC_DELAY seconds are merged
+        and sent in one request, followed by a single refresh of the lists.
+        With immediate the queued changes are sent without waiting.
+        """
+        offline_id = shopping_list["OfflineId"]
+        changes.apply(shopping_list)
+        self._index_shopping_list(shopping_list)
+        self._async_schedule_snapshot_save()
+        self._pendingChanges.setdefault(
+            offline_id, IcaShoppingListChangeSet()
+        ).update(changes)
+        self._async_schedule_queue_save()
+        self._pollInterval.note_activity()
+        self.async_update_listeners()
+
+        if offline_id in self._syncRetries:
+            # The list is backing off after a failed sync, the retry sends it
+            return
+        if immediate:
+            if debouncer := self._syncDebouncers.get(offline_id):
+                debouncer.async_cancel()
+            await self._async_sync_shopping_list(offline_id)
+            return
+        await self._sync_debouncer(offline_id).async_call()
+
+    def _sync_debouncer(self, offline_id: str) -> Debouncer:
+        """Return the debouncer that merges the syncs of a shopping list."""
+        if (debouncer := self._syncDebouncers.get(offline_id)) is None:
+            debouncer = self._syncDebouncers[offline_id] = Debouncer(
+                self.hass,
+                self.logger,
+                cooldown=SYNC_DELAY,
+                immediate=False,
+                function=partial(self._async_sync_shopping_list, offline_id),
+            )
+        return debouncer
+
+    async def _async_sync_shopping_list(self, offline_id: str) -> None:
+        """Send the queued changes of a shopping list and refresh the lists.
+
+        The changes are taken off the queue while the requests are in flight,
+        at most MAX_SYNC_ROWS rows per request. If a request fails, the
+        changes not yet sent are put back in front of any changes queued
+        since and retried with exponential backoff. Changes that ICA rejects
+        outright are dropped, and the list is downloaded again. Changes
+        queued during a successful sync are sent by another one.
+        """
+        changes = self._pendingChanges.pop(offline_id, None)
+        shopping_list = self._get_shopping_list_by_offline_id(offline_id)
+        if not changes or shopping_list is None:
+            self._async_schedule_queue_save()
+            return
+        chunks = changes.chunks(MAX_SYNC_ROWS)
+        for n, chunk in enumerate(chunks):
+            try:
+                await self.api.sync_shopping_list(shopping_list, chunk)
+            except Exception as err:  # pylint: disable=broad-except
+                if _is_rejected(err):
+                    self.logger.error(
+                        "ICA rejected changes to shopping list %s: %s %s",
+                        shopping_list["Title"],
+                        err,
+                        chunk.payload(),
+                    )
+                    # The cached list still holds the rejected edits, so the
+                    # server copy is downloaded again on the refresh below
+                    self._listVersions.pop(offline_id, None)
+                    continue
+                self.logger.warning(
+                    "Error syncing shopping list %s: %s", shopping_list["Title"], err
+                )
+                unsent = IcaShoppingListChangeSet()
+                for remaining in chunks[n:]:
+                    unsent.update(remaining)
+                if newer := self._pendingChanges.get(offline_id):
+                    unsent.update(newer)
+                self._pendingChanges[offline_id] = unsent
+                self._async_schedule_queue_save()
+                self._async_schedule_sync_retry(offline_id)
+                return
+        self._syncBackoff.reset(offline_id)
+        self._async_schedule_queue_save()
+        await self.async_refresh_shopping_lists()
+        if self._pendingChanges.get(offline_id) and offline_id not in self._syncRetries:
+            # Edits queued while this sync ran were not scheduled by the
+            # debouncer, which was busy running it. Its call from a new task
+            # comes after the debouncer is done and waits for its cooldown.
+            self.hass.async_create_task(self._sync_debouncer(offline_id).async_call())
+
+    @callback
+    def _async_schedule_sync_retry(self, offline_id: str) -> None:
+        """Sync a shopping list again after the backoff delay."""
+        if offline_id in self._syncRetries:
+            return
+        delay = self._syncBackoff.next_delay(offline_id)
+        self.logger.debug("Syncing shopping list %s in %.0f s", offline_id, delay)
+
+        @callback
+        def retry(_now) -> None:
+            self._syncRetries.pop(offline_id, None)
+            self.hass.async_create_task(self._async_retry_sync(offline_id))
+
+        self._syncRetries[offline_id] = async_call_later(self.hass, delay, retry)
+
+    async def _async_retry_sync(self, offline_id: str) -> None:
+        """Refresh the lists, reconciling the queued changes, then sync them."""
+        await self.async_refresh_shopping_lists()
+        if not self.last_update_success:
+            self._async_schedule_sync_retry(offline_id)
+            return
+        await self._async_sync_shopping_list(offline_id)
+
+    @callback
+    def _async_resume_sync_retries(self) -> None:
+        """Retry soon after ICA answers again, instead of after a long backoff.
+
+        Every list starts over from the shortest, randomized delay, so the
+        queued changes do not all arrive at once.
+        """
+        for offline_id in list(self._syncRetries):
+            if self._syncBackoff.attempts(offline_id) > 1:
+                self._syncRetries.pop(offline_id)()
+                self._syncBackoff.reset(offline_id)
+                self._async_schedule_sync_retry(offline_id)
+
+    @callback
+    def _async_cancel_sync_retries(self) -> None:
+        for cancel in self._syncRetries.values():
+            cancel()
+        self._syncRetries.clear()
+
+    async def async_sync_pending_changes(self) -> None:
+        """Send all queued changes right away."""
+        for debouncer in self._syncDebouncers.values():
+            debouncer.async_cancel()
+        self._async_cancel_sync_retries()
+        for offline_id in list(self._pendingChanges):
+            await self._async_sync_shopping_list(offline_id)
+
+    async def async_shutdown(self) -> None:
+        """Stop retrying and write the edits not yet synced to disk."""
+        self._async_cancel_sync_retries()
+        await self._queueStore.async_save(self._queue_data())
+        await super().async_shutdown()
 
     async def async_get_shopping_lists(self) -> list[IcaShoppingList]:
         """Return ICA shopping lists fetched at most once."""
         if self._icaShoppingLists is None:
-            x = await self.api.get_shopping_lists()
-            if "ShoppingLists" in x:
-                y = x["ShoppingLists"]
-                self._icaShoppingLists = [
-                    await self.api.get_shopping_list(z["OfflineId"]) for z in y
-                ]
+            await self._async_update_shopping_lists()
 
         return self._icaShoppingLists
 
+    async def _async_update_shopping_lists(self) -> None:
+        """Fetch the shopping lists and re-index the ones that changed."""
+        shopping_lists = await self._async_fetch_shopping_lists()
+        current = {x["OfflineId"] for x in shopping_lists}
+        changed = False
+        for shopping_list in list(self._listsByOfflineId.values()):
+            if shopping_list["OfflineId"] not in current:
+                self._unindex_shopping_list(shopping_list)
+                changed = True
+        for shopping_list in shopping_lists:
+            indexed = self._listsByOfflineId.get(shopping_list["OfflineId"])
+            if indexed is not shopping_list:
+                # A new download holds what ICA has, queued edits are
+                # reconciled with it before they are applied again
+                if changes := self._pendingChanges.get(shopping_list["OfflineId"]):
+                    changes.reconcile(shopping_list)
+                    self._async_schedule_queue_save()
+                self._index_shopping_list(shopping_list)
+                changed = True
+        self._icaShoppingLists = shopping_lists
+        if changed:
+            self._listsChanged = True
+            self._update_classifier_history()
+            self._async_schedule_snapshot_save()
+
+    async def _async_fetch_shopping_list(self, offline_id: str) -> IcaShoppingList:
+        """Fetch a single shopping list, bounded by the concurrency limit."""
+        async with self._semaphore:
+            async with asyncio.timeout(self._requestTimeout):
+                return await self.api.get_shopping_list(offline_id)
+
+    async def _async_fetch_shopping_lists(self) -> list[IcaShoppingList]:
+        """Fetch ICA shopping lists, downloading only lists that changed.
+
+        The list index carries each list's LatestChange. Lists whose version
+        matches the one recorded at their last download keep their cached copy,
+        the rest are fetched concurrently. A list that fails to download keeps
+        its previously fetched copy and is marked stale instead of failing the
+        whole refresh.
+        """
+        x = await self.api.get_shopping_lists()
+        if "ShoppingLists" not in x:
+            self._listVersions = {}
+            return []
+        y = x["ShoppingLists"]
+
+        previous = self._listsByOfflineId
+        changed = [
+            z
+            for z in y
+            if z["OfflineId"] not in previous
+            or z.get("LatestChange") is None
+            or self._listVersions.get(z["OfflineId"]) != z["LatestChange"]
+        ]
+        results = await asyncio.gather(
+            *[self._async_fetch_shopping_list(z["OfflineId"]) for z in changed],
+            return_exceptions=True,
+        )
+
+        fetched: dict[str, IcaShoppingList] = {}
+        stale: set[str] = set()
+        errors: list[BaseException] = []
+        for z, result in zip(changed, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, BaseException):
+                errors.append(result)
+                self.logger.warning(
+                    "Error fetching shopping list %s: %s",
+                    z.get("Title", z["OfflineId"]),
+                    result or type(result).__name__,
+                )
+                if z["OfflineId"] in previous:
+                    stale.add(z["OfflineId"])
+                continue
+            fetched[z["OfflineId"]] = result
+            self._listVersions[z["OfflineId"]] = z.get("LatestChange")
+
+        if errors and len(errors) == len(y):
+            raise errors[0]
+
+        self.logger.debug(
+            "Fetched %d of %d shopping lists, %d failed",
+            len(fetched),
+            len(y),
+            len(errors),
+        )
+        index = {z["OfflineId"] for z in y}
+        self._listVersions = {
+            k: v for k, v in self._listVersions.items() if k in index
+        }
+        self._staleLists = stale
+        return [
+            fetched.get(z["OfflineId"]) or previous[z["OfflineId"]]
+            for z in y
+            if z["OfflineId"] in fetched or z["OfflineId"] in previous
+        ]
+
     async def async_get_product_categories(self) -> list[IcaProductCategory]:
         """Return ICA product categories fetched at most once."""
         if self._productCategories is None:
-            self._productCategories = await self.api.get_product_categories()
+            self._set_product_categories(await self.api.get_product_categories())
         return self._productCategories
 
-    async def async_get_stores(self) -> list[IcaStore]:
+    async def async_get_stores(self) -> list[IcaStoreModel]:
         """Return ICA favorite stores fetched at most once."""
         if self._stores is None:
-            self._stores = await self.api.get_favorite_stores()
+            self._stores = await self._async_fetch_stores()
         return self._stores
 
-    async def async_get_offers(self) -> list[IcaOffer]:
+    async def _async_fetch_store(self, store_id: int) -> IcaStoreModel:
+        """Fetch a single store, bounded by the concurrency limit."""
+        async with self._semaphore:
+            async with asyncio.timeout(self._requestTimeout):
+                return await self.api.get_store(store_id)
+
+    async def _async_fetch_stores(self) -> list[IcaStoreModel]:
+        """Resolve favorite stores, only fetching those missing from the cache."""
+        await self._storeCache.async_load()
+        store_ids = await self.api.get_favorite_store_ids()
+        # Read the cache once, entries may expire while missing ones are fetched
+        stores: dict[int, IcaStoreModel] = {
+            x: IcaStoreModel.from_json(cached)
+            for x in store_ids
+            if (cached := self._storeCache.get(x)) is not None
+        }
+        missing = [x for x in store_ids if x not in stores]
+        if missing:
+            fetched = await asyncio.gather(
+                *[self._async_fetch_store(x) for x in missing]
+            )
+            for store_id, store in zip(missing, fetched):
+                self._storeCache.set(store_id, store.as_json())
+                stores[store_id] = store
+        return [stores[x] for x in store_ids]
+
+    async def async_get_offers(self) -> list[IcaOfferModel]:
         """Return ICA offers at favorite stores fetched at most once."""
-        stores = await self.async_get_stores()
         if self._icaOffers is None:
-            self._icaOffers = await self.api.get_offers([s["Id"] for s in stores])
+            await self._async_refresh_offers()
         return self._icaOffers
 
-    async def async_get_recipes(self, nRecipes: int) -> list[IcaRecipe]:
-        """Return ICA recipes."""
-        if self._icaRecipes is None:
-            self._icaRecipes = await self.api.get_random_recipes(nRecipes)
-        return self._icaRecipes
+    @property
+    def recipes(self) -> list[IcaRecipe]:
+        """Return the random recipes of the current rotation of the pool."""
+        pool = self._icaRecipes or []
+        if len(pool) <= self._nRecipes:
+            return pool
+        rotation = int(time.time() // RECIPE_ROTATION.total_seconds())
+        start = rotation * self._nRecipes
+        return [pool[(start + n) % len(pool)] for n in range(self._nRecipes)]
+
+    async def async_get_recipe(self, recipeId: int) -> IcaRecipe:
+        """Return a recipe, from the pool or the recipe cache if it is there."""
+        for recipe in self._icaRecipes or []:
+            if recipe["Id"] == recipeId:
+                return recipe
+        await self._recipeCache.async_load()
+        if (recipe := self._recipeCache.get(recipeId)) is None:
+            recipe = await self.api.get_recipe(recipeId)
+            self._recipeCache.set(recipeId, recipe)
+        return recipe
+
+    async def async_get_recipes(self) -> list[IcaRecipe]:
+        """Return the random recipes of the current rotation."""
+        if self._icaRecipes is None and self._nRecipes:
+            await self._async_refresh_recipes()
+        return self.recipes
+
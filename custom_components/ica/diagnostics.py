@@ -0,0 +1,43 @@
+"""Diagnostics support for ICA."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, CONF_ICA_ID, CONF_ICA_PIN
+from .coordinator import IcaCoordinator
+
+TO_REDACT = {CONF_ICA_ID, CONF_ICA_PIN}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: IcaCoordinator = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "shopping_lists": [
+            {
+                "rows": len(x["Rows"] or []),
+                "latest_change": x.get("LatestChange"),
+                "stale": coordinator.is_shopping_list_stale(x),
+            }
+            for x in coordinator.shopping_lists
+        ],
+        "pending_changes": {
+            offline_id: {key: len(rows) for key, rows in payload.items()}
+            for offline_id, payload in coordinator.pending_changes.items()
+        },
+        "last_update_success": coordinator.last_update_success,
+        "update_interval_s": coordinator.update_interval.total_seconds()
+        if coordinator.update_interval
+        else None,
+        "stats": coordinator.api.stats.as_dict(),
+    }
@@ -1,13 +1,23 @@
 from __future__ import annotations
+from collections.abc import Callable
+from dataclasses import dataclass
 from typing import Any, Dict
-from requests import Session
+from aiohttp import ClientResponse, ClientSession, hdrs
+import codecs
+import hashlib
 import json
+import time
 from .const import AUTH_TICKET
+from .stats import IcaRequestStats
 
 CONTENT_TYPE = ("Content-Type", "application/json; charset=utf-8")
 AUTHORIZATION = (AUTH_TICKET, "%s")
 X_REQUEST_ID = ("X-Request-Id", "%s")
 
+# Bytes read at a time when a response is decoded while it streams in
+STREAM_CHUNK_SIZE = 64 * 1024
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+
 
 def create_headers(
     auth_key: str | None = None,
@@ -25,62 +35,268 @@ def create_headers(
     return headers
 
 
-def get(
-    session: Session,
+@dataclass
+class CachedResponse:
+    ### Validators and decoded body of the last response for a URL ###
+    etag: str | None
+    last_modified: str | None
+    digest: bytes
+    data: Any
+
+
+class ResponseCache:
+    ### Remembers responses per URL for conditional requests ###
+    # The decoded data is shared between calls and must not be modified,
+    # other than by replacing items with equal ones.
+    def __init__(self) -> None:
+        self._responses: Dict[str, CachedResponse] = {}
+
+    def get(self, url: str) -> CachedResponse | None:
+        return self._responses.get(url)
+
+    def set(self, url: str, response: CachedResponse) -> None:
+        self._responses[url] = response
+
+    def discard(self, url: str) -> None:
+        self._responses.pop(url, None)
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if cached := self._responses.get(url):
+            if cached.etag:
+                headers[hdrs.IF_NONE_MATCH] = cached.etag
+            if cached.last_modified:
+                headers[hdrs.IF_MODIFIED_SINCE] = cached.last_modified
+        return headers
+
+
+class JsonArrayStream:
+    ### Incremental decoder of a JSON array, one element at a time ###
+    # Only the text of the element being received is buffered, so memory is
+    # bounded by the largest element rather than by the whole response. A
+    # document that is not an array is buffered and decoded in close().
+    def __init__(self) -> None:
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._done = False
+        self._is_array: bool | None = None
+
+    @property
+    def is_array(self) -> bool:
+        return bool(self._is_array)
+
+    def feed(self, chunk: bytes, final: bool = False) -> list[Any]:
+        self._buffer += self._text.decode(chunk, final)
+        if self._is_array is None:
+            start = self._buffer.lstrip()
+            if not start:
+                return []
+            self._is_array = start[0] == "["
+            self._buffer = start[1:] if self._is_array else start
+        if not self._is_array or self._done:
+            return []
+
+        items: list[Any] = []
+        buffer = self._buffer
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                break
+            if buffer[pos] == "]":
+                self._done = True
+                pos += 1
+                break
+            try:
+                item, end = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break
+            # A number cut by the end of the chunk may continue in the next one
+            if not final and (end == len(buffer) or buffer[end] in _NUMBER_CHARS):
+                break
+            items.append(item)
+            pos = end
+        self._buffer = buffer[pos:]
+        return items
+
+    def close(self) -> Any:
+        ### Return the document if it was not an array ###
+        if self._is_array is False:
+            return json.loads(self._buffer) if self._buffer.strip() else None
+        if self._is_array and not self._done:
+            raise json.JSONDecodeError("Unterminated array", self._buffer, 0)
+        return None
+
+
+class RequestTimer:
+    ### Records a request in the stats when the block exits ###
+    def __init__(
+        self, stats: IcaRequestStats | None, method: str, url: str, bytes_out: int = 0
+    ) -> None:
+        self._stats = stats
+        self._method = method
+        self._url = url
+        self.bytes_out = bytes_out
+        self.bytes_in = 0
+        self.error = True
+        self.not_modified = False
+
+    def __enter__(self) -> RequestTimer:
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._stats is not None:
+            self._stats.record_request(
+                self._method,
+                self._url,
+                (time.perf_counter() - self._start) * 1000,
+                self.bytes_in,
+                self.bytes_out,
+                self.error,
+                self.not_modified,
+            )
+
+
+async def _read_items(
+    response: ClientResponse,
+    timer: RequestTimer,
+    decode_item: Callable[[Any], Any],
+) -> tuple[Any, bytes]:
+    # Decode the elements of a JSON array response as the chunks arrive
+    digest = hashlib.blake2b(digest_size=16)
+    stream = JsonArrayStream()
+    items: list[Any] = []
+    async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+        timer.bytes_in += len(chunk)
+        digest.update(chunk)
+        items.extend(map(decode_item, stream.feed(chunk)))
+    items.extend(map(decode_item, stream.feed(b"", final=True)))
+    document = stream.close()
+    return items if stream.is_array else document, digest.digest()
+
+
+async def get(
+    session: ClientSession,
     url: str,
     auth_key: str | None = None,
     params: Dict[str, Any] | None = None,
+    stats: IcaRequestStats | None = None,
+    cache: ResponseCache | None = None,
+    decode: Callable[[Any], Any] | None = None,
+    decode_item: Callable[[Any], Any] | None = None,
 ):
-    response = session.get(
-        url, params=params, headers=create_headers(auth_key=auth_key)
-    )
+    headers = create_headers(auth_key=auth_key)
+    if cache is not None:
+        headers.update(cache.conditional_headers(url))
+
+    with RequestTimer(stats, "GET", url) as timer:
+        async with session.get(url, params=params, headers=headers) as response:
+            cached = cache.get(url) if cache is not None else None
+            if response.status == 304 and cached is not None:
+                timer.error = False
+                timer.not_modified = True
+                return cached.data
 
-    if response.status_code == 200:
-        return response.json()
+            if response.status == 200 and decode_item is not None:
+                data, digest = await _read_items(response, timer, decode_item)
+                timer.error = False
+                if cached is not None and cached.digest == digest:
+                    # Keep the cached objects so unchanged data stays identical
+                    data = cached.data
+                if cache is not None:
+                    cache.set(
+                        url,
+                        CachedResponse(
+                            response.headers.get(hdrs.ETAG),
+                            response.headers.get(hdrs.LAST_MODIFIED),
+                            digest,
+                            data,
+                        ),
+                    )
+                return data
 
-    response.raise_for_status()
-    return response.ok
+            body = await response.read()
+            timer.bytes_in = len(body)
+            timer.error = response.status >= 400
+            if response.status == 200:
+                if cache is None:
+                    data = json.loads(body) if body.strip() else None
+                    return decode(data) if decode else data
+                # Without validators from the server an unchanged body is
+                # still recognised and not decoded again
+                digest = hashlib.blake2b(body, digest_size=16).digest()
+                if cached is not None and cached.digest == digest:
+                    data = cached.data
+                else:
+                    data = json.loads(body) if body.strip() else None
+                    if decode:
+                        data = decode(data)
+                cache.set(
+                    url,
+                    CachedResponse(
+                        response.headers.get(hdrs.ETAG),
+                        response.headers.get(hdrs.LAST_MODIFIED),
+                        digest,
+                        data,
+                    ),
+                )
+                return data
 
+            response.raise_for_status()
+            return response.ok
 
-def post(
-    session: Session,
+
+async def post(
+    session: ClientSession,
     url: str,
     auth_key: str | None = None,
     data: Dict[str, Any] | None = None,
+    stats: IcaRequestStats | None = None,
 ):
     request_id = data.pop("request_id", None) if data else None
 
     headers = create_headers(
         auth_key=auth_key, with_content=True if data else False, request_id=request_id
     )
+    payload = json.dumps(data) if data else None
 
-    response = session.post(
-        url,
-        headers=headers,
-        data=json.dumps(data) if data else None,
-    )
+    with RequestTimer(stats, "POST", url, len(payload or "")) as timer:
+        async with session.post(
+            url,
+            headers=headers,
+            data=payload,
+        ) as response:
+            body = await response.read()
+            timer.bytes_in = len(body)
+            timer.error = response.status >= 400
+            if response.status == 200:
+                return json.loads(body) if body.strip() else None
 
-    if response.status_code == 200:
-        return response.json()
+            response.raise_for_status()
+            return response.ok
 
-    response.raise_for_status()
-    return response.ok
 
-
-def delete(
-    session: Session,
+async def delete(
+    session: ClientSession,
     url: str,
     auth_key: str | None = None,
     args: Dict[str, Any] | None = None,
+    stats: IcaRequestStats | None = None,
 ):
     request_id = args.pop("request_id", None) if args else None
 
     headers = create_headers(auth_key=auth_key, request_id=request_id)
 
-    response = session.delete(
-        url,
-        headers=headers,
-    )
-
-    response.raise_for_status()
-    return response.ok
+    with RequestTimer(stats, "DELETE", url) as timer:
+        async with session.delete(
+            url,
+            headers=headers,
+        ) as response:
+            timer.error = response.status >= 400
+            response.raise_for_status()
+            return response.ok
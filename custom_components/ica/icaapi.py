@@ -1,7 +1,25 @@
-import requests
+from aiohttp import BasicAuth, ClientResponseError, ClientSession
+import asyncio
+from collections.abc import Callable
+from http import HTTPStatus
 import json
-from datetime import datetime
-from .http_requests import get, post, delete
+import time
+from datetime import datetime, timedelta
+from .changeset import (
+    IcaShoppingListChangeSet,
+    CREATED_ROWS,
+    CHANGED_ROWS,
+    DELETED_ROWS,
+)
+from .http_requests import RequestTimer, ResponseCache, get, post, delete
+from .models import (
+    IcaOfferModel,
+    IcaStoreModel,
+    intern_product_category,
+    intern_shopping_list,
+)
+from .ratelimit import IcaRateLimiter
+from .stats import IcaRequestStats
 from .const import (
     AUTH_TICKET,
     LIST_NAME,
@@ -24,74 +42,197 @@ from .const import (
     ARTICLEGROUPS_ENDPOINT,
     RANDOM_RECIPES_ENDPOINT,
     MY_COMMON_ARTICLES_ENDPOINT,
+    AUTH_TICKET_LIFETIME,
+    AUTH_TICKET_REFRESH_MARGIN,
 )
-from .icatypes import IcaStore, IcaOffer, IcaShoppingList, IcaProductCategory, IcaRecipe
+from .icatypes import IcaShoppingList, IcaProductCategory, IcaRecipe
+
+
+def get_rest_url(endpoint: str, base_url: str = BASE_URL):
+    return "/".join([base_url, endpoint])
+
+
+async def get_auth_key(
+    session: ClientSession,
+    user,
+    psw,
+    base_url: str = BASE_URL,
+    stats: IcaRequestStats | None = None,
+):
+    url = get_rest_url(AUTH_ENDPOINT, base_url)
+    auth = BasicAuth(user, psw)
+    with RequestTimer(stats, "GET", url) as timer:
+        async with session.get(url, auth=auth) as response:
+            timer.error = response.status >= 400
+            response.raise_for_status()
+            return response.headers[AUTH_TICKET]
+
 
+class IcaAuthManager:
+    ### Class to hold the authentication ticket of an ICA account ###
+    def __init__(
+        self,
+        session: ClientSession,
+        user,
+        psw,
+        lifetime: timedelta = AUTH_TICKET_LIFETIME,
+        on_ticket: Callable[[str, float], None] | None = None,
+        base_url: str = BASE_URL,
+        stats: IcaRequestStats | None = None,
+    ) -> None:
+        self._session = session
+        self._base_url = base_url
+        self._stats = stats
+        self._user = user
+        self._psw = psw
+        self._lifetime = lifetime.total_seconds()
+        self._on_ticket = on_ticket
+        self._ticket: str | None = None
+        self._expires: float = 0.0
+        self._lock = asyncio.Lock()
 
-def get_rest_url(endpoint: str):
-    return "/".join([BASE_URL, endpoint])
+    def restore(self, ticket: str, expires: float) -> None:
+        """Reuse a ticket stored before a restart."""
+        self._ticket = ticket
+        self._expires = expires
 
+    def _is_valid(self) -> bool:
+        margin = AUTH_TICKET_REFRESH_MARGIN.total_seconds()
+        return self._ticket is not None and time.time() < self._expires - margin
 
-def get_auth_key(user, psw):
-    url = get_rest_url(AUTH_ENDPOINT)
-    auth = (user, psw)
-    response = requests.get(url, auth=auth)
-    if response:
-        return response.headers[AUTH_TICKET]
-    return None
+    async def async_get_ticket(self) -> str:
+        """Return a valid ticket, logging in if it is missing or about to expire.
+
+        Concurrent callers share a single login.
+        """
+        if self._is_valid():
+            return self._ticket
+        async with self._lock:
+            if not self._is_valid():
+                self._ticket = await get_auth_key(
+                    self._session, self._user, self._psw, self._base_url, self._stats
+                )
+                self._expires = time.time() + self._lifetime
+                if self._on_ticket:
+                    self._on_ticket(self._ticket, self._expires)
+            return self._ticket
+
+    def invalidate(self, ticket: str) -> None:
+        """Drop a ticket the server rejected, unless it was already replaced."""
+        if self._ticket == ticket:
+            self._ticket = None
 
 
 class IcaAPI:
     ### Class to retrieve and manipulate ICA Shopping lists ###
-    def __init__(self, user, psw, session: requests.Session | None = None) -> None:
-        self._auth_key = get_auth_key(user, psw)
-        self._session = session or requests.Session()
-
-    def get_shopping_lists(self) -> list[IcaShoppingList]:
-        url = get_rest_url(MY_LISTS_ENDPOINT)
-        return get(self._session, url, self._auth_key)
-
-    def get_shopping_list(self, list_id: str) -> IcaShoppingList:
-        url = str.format(get_rest_url(MY_LIST_ENDPOINT), list_id)
-        return get(self._session, url, self._auth_key)
-
-    def get_store(self, store_id) -> IcaStore:
-        url = str.format(get_rest_url(STORE_ENDPOINT), store_id)
-        return get(self._session, url, self._auth_key)
-
-    def get_favorite_stores(self) -> list[IcaStore]:
-        url = get_rest_url(MY_STORES_ENDPOINT)
-        fav_stores = get(self._session, url, self._auth_key)
-        return [self.get_store(store_id) for store_id in fav_stores["FavoriteStores"]]
-
-    def get_favorite_products(self):
-        url = get_rest_url(MY_COMMON_ARTICLES_ENDPOINT)
-        fav_products = get(self._session, url, self._auth_key)
+    def __init__(
+        self,
+        auth: IcaAuthManager,
+        session: ClientSession,
+        base_url: str = BASE_URL,
+        stats: IcaRequestStats | None = None,
+        limiter: IcaRateLimiter | None = None,
+    ) -> None:
+        self._auth = auth
+        self._session = session
+        self._base_url = base_url
+        self._stats = stats
+        self._limiter = limiter
+        self._response_cache = ResponseCache()
+
+    def _rest_url(self, endpoint: str) -> str:
+        return get_rest_url(endpoint, self._base_url)
+
+    async def _request(self, method, url: str, *args, **kwargs):
+        """Call an http_requests method, logging in again once on 401."""
+        kwargs["stats"] = self._stats
+        ticket = await self._auth.async_get_ticket()
+        try:
+            if self._limiter:
+                await self._limiter.acquire()
+            return await method(self._session, url, ticket, *args, **kwargs)
+        except ClientResponseError as err:
+            if err.status != HTTPStatus.UNAUTHORIZED:
+                raise
+            self._auth.invalidate(ticket)
+        ticket = await self._auth.async_get_ticket()
+        if self._limiter:
+            await self._limiter.acquire()
+        return await method(self._session, url, ticket, *args, **kwargs)
+
+    async def get_shopping_lists(self) -> list[IcaShoppingList]:
+        url = self._rest_url(MY_LISTS_ENDPOINT)
+        return await self._request(get, url)
+
+    async def get_shopping_list(self, list_id: str) -> IcaShoppingList:
+        url = str.format(self._rest_url(MY_LIST_ENDPOINT), list_id)
+        return intern_shopping_list(await self._request(get, url))
+
+    async def get_store(self, store_id) -> IcaStoreModel:
+        url = str.format(self._rest_url(STORE_ENDPOINT), store_id)
+        return await self._request(get, url, decode=IcaStoreModel.from_json)
+
+    async def get_favorite_store_ids(self) -> list[int]:
+        url = self._rest_url(MY_STORES_ENDPOINT)
+        fav_stores = await self._request(get, url)
+        return fav_stores["FavoriteStores"]
+
+    async def get_favorite_stores(self) -> list[IcaStoreModel]:
+        store_ids = await self.get_favorite_store_ids()
+        return list(
+            await asyncio.gather(*[self.get_store(store_id) for store_id in store_ids])
+        )
+
+    async def get_favorite_products(self):
+        url = self._rest_url(MY_COMMON_ARTICLES_ENDPOINT)
+        fav_products = await self._request(get, url)
         return (
             fav_products["CommonArticles"] if "CommonArticles" in fav_products else None
         )
 
-    def get_offers(self, store_ids: list[int]) -> list[IcaOffer]:
-        url = str.format(
-            get_rest_url(OFFERS_ENDPOINT), ",".join(map(lambda x: str(x), store_ids))
+    def _offers_url(self, store_ids: list[int]) -> str:
+        return str.format(
+            self._rest_url(OFFERS_ENDPOINT), ",".join(map(lambda x: str(x), store_ids))
+        )
+
+    async def get_offers(self, store_ids: list[int]) -> list[IcaOfferModel]:
+        url = self._offers_url(store_ids)
+        # Offers are decoded one by one as the response streams in
+        return await self._request(
+            get,
+            url,
+            cache=self._response_cache,
+            decode_item=IcaOfferModel.from_json,
         )
-        return get(self._session, url, self._auth_key)
 
-    def get_random_recipes(self, nRecipes: int = 5) -> list[IcaRecipe]:
-        url = str.format(get_rest_url(RANDOM_RECIPES_ENDPOINT), nRecipes)
-        return get(self._session, url, self._auth_key)
+    def forget_offers(self, store_ids: list[int]) -> None:
+        ### Drop the cached offers response of a set of stores ###
+        self._response_cache.discard(self._offers_url(store_ids))
 
-    def get_product_categories(self) -> list[IcaProductCategory]:
-        url = get_rest_url(
+    async def get_recipe(self, recipe_id: int) -> IcaRecipe:
+        url = str.format(self._rest_url(RECIPE_ENDPOINT), recipe_id)
+        return await self._request(get, url)
+
+    async def get_random_recipes(self, nRecipes: int = 5) -> list[IcaRecipe]:
+        url = str.format(self._rest_url(RANDOM_RECIPES_ENDPOINT), nRecipes)
+        return await self._request(get, url)
+
+    async def get_product_categories(self) -> list[IcaProductCategory]:
+        url = self._rest_url(
             # str.format(ARTICLEGROUPS_ENDPOINT, datetime.date(datetime.now()))
             str.format(ARTICLEGROUPS_ENDPOINT, "2001-01-01")
         )
-        return get(self._session, url, self._auth_key)
+        return await self._request(
+            get,
+            url,
+            cache=self._response_cache,
+            decode_item=intern_product_category,
+        )
 
-    def create_shopping_list(
+    async def create_shopping_list(
         self, offline_id: int, title: str, comment: str, storeSorting: bool = True
     ) -> IcaShoppingList:
-        url = get_rest_url(MY_LISTS_ENDPOINT)
+        url = self._rest_url(MY_LISTS_ENDPOINT)
         data = {
             "OfflineId": str(offline_id),
             "Title": title,
@@ -100,34 +241,28 @@ class IcaAPI:
             "Rows": [],
             "LatestChange": datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
         }
-        response = post(self._session, url, self._auth_key, data)
+        response = await self._request(post, url, data)
         # list_id = response["id"]
-        return self.get_shopping_list(offline_id)
-
-    def sync_shopping_list(self, data: IcaShoppingList):
-        url = str.format(get_rest_url(MY_LIST_SYNC_ENDPOINT), data["OfflineId"])
-        # new_rows = [x for x in data["Rows"] if "SourceId" in x and x["SourceId"] == -1]
-        # data = {"ChangedRows": new_rows}
-
-        if "DeletedRows" in data:
-            sync_data = {"DeletedRows": data["DeletedRows"]}
-        elif "ChangedRows" in data:
-            sync_data = {"ChangedRows": data["ChangedRows"]}
-        elif "CreatedRows" in data:
-            sync_data = {"CreatedRows": data["CreatedRows"]}
-        else:
-            sync_data = data
-
-        data2 = post(self._session, url, self._auth_key, sync_data)
-        # if data is not None and "Rows" in data:
-        #    for row in data["Rows"]:
-        #        name = row["ProductName"]
-        #        uuid = row["OfflineId"]
-        #        status = row["IsStrikedOver"]
-        #        source = row["SourceId"]
+        return await self.get_shopping_list(offline_id)
+
+    async def sync_shopping_list(
+        self,
+        data: IcaShoppingList,
+        changes: IcaShoppingListChangeSet | None = None,
+    ):
+        url = str.format(self._rest_url(MY_LIST_SYNC_ENDPOINT), data["OfflineId"])
+        if changes is None:
+            changes = IcaShoppingListChangeSet.from_shopping_list(data)
+
+        # All row operations go in one request, without changes the whole list
+        sync_data = changes.payload() if changes else data
+
+        data2 = await self._request(post, url, sync_data)
+        for key in (CREATED_ROWS, CHANGED_ROWS, DELETED_ROWS):
+            data.pop(key, None)
 
         return data2
 
-    def delete_shopping_list(self, offline_id: int):
-        url = str.format(get_rest_url(MY_LIST_ENDPOINT), offline_id)
-        return delete(self._session, url, self._auth_key)
+    async def delete_shopping_list(self, offline_id: int):
+        url = str.format(self._rest_url(MY_LIST_ENDPOINT), offline_id)
+        return await self._request(delete, url)
@@ -1,86 +1,86 @@
-import requests
-import asyncio
-
-from .icaapi import IcaAPI
+from aiohttp import ClientSession
+
+from .changeset import IcaShoppingListChangeSet
+from .const import BASE_URL
+from .stats import IcaRequestStats
+from .icaapi import IcaAPI, IcaAuthManager
+from .models import IcaOfferModel, IcaStoreModel
+from .ratelimit import IcaRateLimiter
 from .icatypes import (
     IcaShoppingList,
-    IcaStore,
-    IcaOffer,
     IcaProductCategory,
     IcaShoppingListEntry,
     IcaRecipe,
 )
 
 
-async def run_async(func):
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, func)
-
-
 class IcaAPIAsync:
     ### Class to retrieve and hold the data for a Shopping list from ICA ###
-    def __init__(self, uid, pin):
+    def __init__(
+        self,
+        uid,
+        pin,
+        session: ClientSession,
+        auth: IcaAuthManager | None = None,
+        base_url: str = BASE_URL,
+        stats: IcaRequestStats | None = None,
+        limiter: IcaRateLimiter | None = None,
+    ):
         self._uid = uid
         self._pin = pin
-        self._api = None
+        self._session = session
+        self.stats = stats or IcaRequestStats()
+        self.auth = auth or IcaAuthManager(
+            session, uid, pin, base_url=base_url, stats=self.stats
+        )
+        self._api = IcaAPI(self.auth, session, base_url, self.stats, limiter)
 
     async def get_shopping_lists(self) -> list[IcaShoppingList]:
-        if not self._api:
-            self._api = await run_async(lambda: IcaAPI(self._uid, self._pin))
-        return await run_async(lambda: self._api.get_shopping_lists())
+        return await self._api.get_shopping_lists()
 
     async def get_shopping_list(self, list_id: str) -> IcaShoppingList:
-        if not self._api:
-            self._api = await run_async(lambda: IcaAPI(self._uid, self._pin))
-        return await run_async(lambda: self._api.get_shopping_list(list_id))
+        return await self._api.get_shopping_list(list_id)
 
-    async def get_store(self, store_id) -> IcaStore:
-        if not self._api:
-            self._api = await run_async(lambda: IcaAPI(self._uid, self._pin))
-        return await run_async(lambda: self._api.get_store(store_id))
+    async def get_store(self, store_id) -> IcaStoreModel:
+        return await self._api.get_store(store_id)
 
-    async def get_favorite_stores(self) -> list[IcaStore]:
-        if not self._api:
-            self._api = await run_async(lambda: IcaAPI(self._uid, self._pin))
-        return await run_async(lambda: self._api.get_favorite_stores())
+    async def get_favorite_store_ids(self) -> list[int]:
+        return await self._api.get_favorite_store_ids()
+
+    async def get_favorite_stores(self) -> list[IcaStoreModel]:
+        return await self._api.get_favorite_stores()
 
     async def get_favorite_products(self):
-        if not self._api:
-            self._api = await run_async(lambda: IcaAPI(self._uid, self._pin))
-        return await run_async(lambda: self._api.get_favorite_products())
+        return await self._api.get_favorite_products()
 
     async def get_product_categories(self) -> list[IcaProductCategory]:
-        if not self._api:
-            self._api = await run_async(lambda: IcaAPI(self._uid, self._pin))
-        return await run_async(lambda: self._api.get_product_categories())
+        return await self._api.get_product_categories()
+
+    async def get_offers(self, store_ids: list[int]) -> list[IcaOfferModel]:
+        return await self._api.get_offers(store_ids)
 
-    async def get_offers(self, store_ids: list[int]) -> list[IcaOffer]:
-        if not self._api:
-            self._api = await run_async(lambda: IcaAPI(self._uid, self._pin))
-        return await run_async(lambda: self._api.get_offers(store_ids))
+    def forget_offers(self, store_ids: list[int]) -> None:
+        self._api.forget_offers(store_ids)
+
+    async def get_recipe(self, recipe_id: int) -> IcaRecipe:
+        return await self._api.get_recipe(recipe_id)
 
     async def get_random_recipes(self, nRecipes: int = 5) -> list[IcaRecipe]:
-        if not self._api:
-            self._api = await run_async(lambda: IcaAPI(self._uid, self._pin))
-        return await run_async(lambda: self._api.get_random_recipes(nRecipes))
+        return await self._api.get_random_recipes(nRecipes)
 
     async def create_shopping_list(
         self, offline_id: int, title: str, comment: str, storeSorting: bool = True
     ):
-        if not self._api:
-            self._api = await run_async(lambda: IcaAPI(self._uid, self._pin))
-        return await run_async(
-            lambda: self._api.create_shopping_list(
-                offline_id, title, comment, storeSorting
-            )
+        return await self._api.create_shopping_list(
+            offline_id, title, comment, storeSorting
         )
 
-    async def sync_shopping_list(self, data: IcaShoppingList):
-        if not self._api:
-            self._api = await run_async(lambda: IcaAPI(self._uid, self._pin))
-        return await run_async(lambda: self._api.sync_shopping_list(data))
+    async def sync_shopping_list(
+        self,
+        data: IcaShoppingList,
+        changes: IcaShoppingListChangeSet | None = None,
+    ):
+        return await self._api.sync_shopping_list(data, changes)
 
     async def delete_shopping_list(self, offline_id):
-        if not self._api:
-            self._api = await run_async(lambda: IcaAPI(self._uid, self._pin))
-        return await run_async(lambda: self._api.delete_shopping_list(offline_id))
+        return await self._api.delete_shopping_list(offline_id)
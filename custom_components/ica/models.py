@@ -0,0 +1,106 @@
+"""Compact models of the ICA data kept in memory.
+
+Offers and stores are decoded from the API responses into frozen, slotted
+dataclasses that hold only the fields the integration uses. Strings that
+repeat across entries, like product and store names, are interned so that
+equal values share one object. The models convert back to the JSON shape of
+the API for the snapshot and the store cache.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import sys
+from typing import Any
+
+from .icatypes import IcaOffer, IcaProductCategory, IcaShoppingList, IcaStore
+
+
+def _intern(value: str | None) -> str | None:
+    return sys.intern(value) if value else value
+
+
+@dataclass(frozen=True, slots=True)
+class IcaOfferModel:
+    """An offer at one or more of the favorite stores."""
+
+    offer_id: str | None
+    store_ids: tuple[int, ...]
+    article_group_id: int | None
+    product_name: str | None
+    offer_type_title: str | None
+    article_descriptions: tuple[str, ...]
+    expired: bool
+
+    @classmethod
+    def from_json(cls, data: IcaOffer) -> IcaOfferModel:
+        return cls(
+            data.get("OfferId"),
+            tuple(data.get("StoreIds") or ()),
+            data.get("ArticleGroupId"),
+            _intern(data.get("ProductName")),
+            _intern(data.get("OfferTypeTitle")),
+            tuple(
+                _intern(description)
+                for article in data.get("Articles") or []
+                if (description := article.get("ArticleDescription"))
+            ),
+            bool(data.get("Expired")),
+        )
+
+    def as_json(self) -> dict[str, Any]:
+        return {
+            "OfferId": self.offer_id,
+            "StoreIds": list(self.store_ids),
+            "ArticleGroupId": self.article_group_id,
+            "ProductName": self.product_name,
+            "OfferTypeTitle": self.offer_type_title,
+            "Articles": [{"ArticleDescription": x} for x in self.article_descriptions],
+            "Expired": self.expired,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class IcaStoreModel:
+    """A favorite store."""
+
+    id: int
+    marketing_name: str | None
+    city: str | None
+
+    @classmethod
+    def from_json(cls, data: IcaStore) -> IcaStoreModel:
+        return cls(
+            data["Id"],
+            _intern(data.get("MarketingName")),
+            _intern((data.get("Address") or {}).get("City")),
+        )
+
+    def as_json(self) -> dict[str, Any]:
+        return {
+            "Id": self.id,
+            "MarketingName": self.marketing_name,
+            "Address": {"City": self.city},
+        }
+
+
+def decode_offers(data: list[IcaOffer] | None) -> list[IcaOfferModel]:
+    """Decode the offers of an API response."""
+    return [IcaOfferModel.from_json(x) for x in data or []]
+
+
+def intern_product_category(category: IcaProductCategory) -> IcaProductCategory:
+    """Intern the name of a downloaded product category, in place."""
+    category["Name"] = _intern(category.get("Name"))
+    return category
+
+
+def intern_shopping_list(shopping_list: IcaShoppingList) -> IcaShoppingList:
+    """Intern the product names of a downloaded shopping list, in place.
+
+    A list without rows gets an empty Rows list, so rows can be added to it.
+    """
+    if shopping_list.get("Rows") is None:
+        shopping_list["Rows"] = []
+    for row in shopping_list["Rows"]:
+        row["ProductName"] = _intern(row.get("ProductName"))
+    return shopping_list
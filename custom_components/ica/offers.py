@@ -0,0 +1,210 @@
+"""Storage of ICA offers and matching of shopping list rows to them."""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from typing import Any
+import heapq
+import re
+
+from .models import IcaOfferModel
+
+# Shortest token suffix indexed, so "mjölk" also finds "filmjölk"
+MIN_SUFFIX_LENGTH = 4
+MAX_MATCHES = 3
+
+_WORD = re.compile(r"[^\W\d_]+")
+_ACCENTS = str.maketrans("éèêáàüëïç", "eeeaaueic")
+# Words that say nothing about the product
+STOPWORDS = frozenset(
+    {"ica", "och", "med", "utan", "ca", "st", "kg", "hg", "g", "l", "dl", "cl", "ml"}
+)
+
+
+def tokenize(text: str | None) -> list[str]:
+    """Split a product name into lower case Swedish words.
+
+    Accents other than å, ä and ö are dropped, as are numbers, units and
+    words that do not describe the product.
+    """
+    if not text:
+        return []
+    words = _WORD.findall(text.casefold().translate(_ACCENTS))
+    return [x for x in words if len(x) > 1 and x not in STOPWORDS]
+
+
+class IcaOfferShards:
+    """Offers of the favorite stores, deduplicated by OfferId.
+
+    Chain wide offers are returned for every store they are valid at. Each
+    offer is held once, and every store keeps the ids of its offers, so the
+    offers of one store can be replaced or dropped without touching the
+    others.
+    """
+
+    def __init__(self) -> None:
+        """Initialize empty shards."""
+        self._offers: dict[Any, IcaOfferModel] = {}
+        self._shards: dict[int, tuple[Any, ...]] = {}
+        self._responses: dict[int, list[IcaOfferModel]] = {}
+        self._merged: list[IcaOfferModel] | None = None
+
+    @staticmethod
+    def _key(offer: IcaOfferModel) -> Any:
+        # Offers without an id are not deduplicated
+        return offer.offer_id if offer.offer_id is not None else offer
+
+    @property
+    def store_ids(self) -> list[int]:
+        """Return the stores that have offers loaded."""
+        return list(self._shards)
+
+    def shard(self, store_id: int) -> list[IcaOfferModel]:
+        """Return the offers of a store."""
+        return [self._offers[x] for x in self._shards.get(store_id, ())]
+
+    def update(self, store_id: int, offers: list[IcaOfferModel]) -> None:
+        """Replace the offers of a store.
+
+        Offers held for another store replace their equal copies in the list,
+        so a response kept for conditional requests holds no duplicates.
+        """
+        if offers is self._responses.get(store_id):
+            return
+        self._responses[store_id] = offers
+        keys = tuple(dict.fromkeys(self._key(x) for x in offers))
+        changed = keys != self._shards.get(store_id)
+        for n, offer in enumerate(offers):
+            key = self._key(offer)
+            if (held := self._offers.get(key)) == offer:
+                # Share the copy already held for another store
+                offers[n] = held
+            else:
+                self._offers[key] = offer
+                changed = True
+        self._shards[store_id] = keys
+        if changed:
+            self._prune()
+
+    def retain(self, store_ids: Iterable[int]) -> None:
+        """Drop the offers of stores that are no longer favorites."""
+        keep = set(store_ids)
+        if removed := [x for x in self._shards if x not in keep]:
+            for store_id in removed:
+                del self._shards[store_id]
+                self._responses.pop(store_id, None)
+            self._prune()
+
+    def _prune(self) -> None:
+        used = {key for keys in self._shards.values() for key in keys}
+        for key in self._offers.keys() - used:
+            del self._offers[key]
+        self._merged = None
+
+    def offers(self) -> list[IcaOfferModel]:
+        """Return every offer once, in store order.
+
+        The same list is returned until a shard changes.
+        """
+        if self._merged is None:
+            keys = dict.fromkeys(k for keys in self._shards.values() for k in keys)
+            self._merged = [self._offers[x] for x in keys]
+        return self._merged
+
+    def as_json(self) -> dict[str, Any]:
+        """Return the offers and shards in a form that can be stored."""
+        offers = self.offers()
+        position = {id(x): n for n, x in enumerate(offers)}
+        return {
+            "offers": [x.as_json() for x in offers],
+            "stores": {
+                str(store_id): [position[id(self._offers[x])] for x in keys]
+                for store_id, keys in self._shards.items()
+            },
+        }
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> IcaOfferShards:
+        """Restore shards stored by as_json."""
+        shards = cls()
+        offers = [IcaOfferModel.from_json(x) for x in data["offers"]]
+        for store_id, positions in data["stores"].items():
+            shards.update(int(store_id), [offers[x] for x in positions])
+        return shards
+
+
+class IcaOfferIndex:
+    """Inverted index from product words and article groups to offers.
+
+    The index is built once from a list of offers. A row is matched by looking
+    up its words, both as whole words and as endings of longer (compound)
+    words, so matching does not depend on the number of offers. Results are
+    cached per product name and article group.
+    """
+
+    def __init__(self, offers: list[IcaOfferModel] | None = None) -> None:
+        """Build the index of the offers that have not expired."""
+        self.offers = offers
+        self._offers: list[IcaOfferModel] = [x for x in offers or [] if not x.expired]
+        self._words: dict[str, set[int]] = {}
+        self._suffixes: dict[str, set[int]] = {}
+        self._groups: dict[int, set[int]] = {}
+        self._matches: dict[tuple[str, int | None], tuple[IcaOfferModel, ...]] = {}
+
+        for n, offer in enumerate(self._offers):
+            texts = [offer.product_name, *offer.article_descriptions]
+            for word in {w for text in texts for w in tokenize(text)}:
+                self._words.setdefault(word, set()).add(n)
+                for start in range(1, len(word) - MIN_SUFFIX_LENGTH + 1):
+                    self._suffixes.setdefault(word[start:], set()).add(n)
+            if offer.article_group_id is not None:
+                self._groups.setdefault(offer.article_group_id, set()).add(n)
+
+    def __len__(self) -> int:
+        return len(self._offers)
+
+    def match(
+        self, product_name: str | None, article_group: int | None = None
+    ) -> tuple[IcaOfferModel, ...]:
+        """Return the best offers for a product, at most MAX_MATCHES.
+
+        Every word of the product name must be found in an offer. Whole word
+        hits rank above compound word hits, and offers in the row's article
+        group rank above others.
+        """
+        key = (product_name or "", article_group)
+        if (matches := self._matches.get(key)) is None:
+            matches = self._matches[key] = self._match(*key)
+        return matches
+
+    def _match(
+        self, product_name: str, article_group: int | None
+    ) -> tuple[IcaOfferModel, ...]:
+        if not (words := tokenize(product_name)):
+            return ()
+        scores: dict[int, int] = {}
+        for n, word in enumerate(words):
+            hits = dict.fromkeys(self._suffixes.get(word, ()), 1)
+            hits.update(dict.fromkeys(self._words.get(word, ()), 2))
+            if n == 0:
+                scores = hits
+            else:
+                scores = {x: scores[x] + hits[x] for x in scores.keys() & hits}
+            if not scores:
+                return ()
+
+        group = self._groups.get(article_group, set())
+        best = heapq.nsmallest(
+            MAX_MATCHES, scores, key=lambda x: (-scores[x], x not in group, x)
+        )
+        return tuple(self._offers[x] for x in best)
+
+
+def describe_offers(offers: Iterable[IcaOfferModel]) -> str | None:
+    """Return a todo item description listing the offers, or None."""
+    lines = [
+        f"{offer.product_name}: {offer.offer_type_title}"
+        if offer.offer_type_title
+        else offer.product_name
+        for offer in offers
+    ]
+    return "\n".join(lines) or None
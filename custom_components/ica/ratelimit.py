@@ -0,0 +1,37 @@
+"""Rate limiting of the requests to the ICA API."""
+from __future__ import annotations
+
+import asyncio
+import time
+
+
+class IcaRateLimiter:
+    """Token bucket limiting the request rate to the ICA API.
+
+    One limiter is shared by all ICA accounts, so adding an account does not
+    raise the rate at which the API is called. Up to burst requests go out
+    at once, after that requests are spaced to the given rate, in the order
+    they arrived.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        """Initialize the limiter with a full bucket."""
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._burst, self._tokens + (now - self._updated) * self._rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
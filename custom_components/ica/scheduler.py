@@ -0,0 +1,151 @@
+"""Refresh and retry scheduling for the ICA data."""
+from __future__ import annotations
+
+from datetime import timedelta
+import random
+import time
+
+
+class IcaRefreshScheduler:
+    """Keep track of when each kind of data is next due for a refresh.
+
+    Every data class has its own interval. A random jitter of up to the given
+    fraction of the interval is added to each deadline so that refreshes of
+    different classes (and different installations) drift apart instead of
+    hitting the API at the same moment.
+    """
+
+    def __init__(
+        self,
+        intervals: dict[str, timedelta],
+        jitter: dict[str, float] | None = None,
+    ) -> None:
+        """Initialize the scheduler. Every data class is due immediately."""
+        self._intervals: dict[str, float] = {
+            name: interval.total_seconds() for name, interval in intervals.items()
+        }
+        self._jitter: dict[str, float] = jitter or {}
+        self._deadlines: dict[str, float] = {}
+        self._refreshed: dict[str, float] = {}
+
+    def is_due(self, name: str) -> bool:
+        """Return True if the data class should be refreshed now."""
+        return time.monotonic() >= self._deadlines.get(name, 0.0)
+
+    def mark_refreshed(self, name: str) -> None:
+        """Record a successful refresh and schedule the next one."""
+        interval = self._intervals.get(name, 0.0)
+        jitter = random.uniform(0.0, self._jitter.get(name, 0.0)) * interval
+        self._deadlines[name] = time.monotonic() + interval + jitter
+        self._refreshed[name] = time.time()
+
+    def mark_failed(self, name: str, delay: float) -> float:
+        """Record a failed refresh and retry it after delay seconds.
+
+        The retry is never later than a regular refresh would have been.
+        Returns the seconds until the retry.
+        """
+        if interval := self._intervals.get(name, 0.0):
+            delay = min(delay, interval)
+        self._deadlines[name] = time.monotonic() + delay
+        return delay
+
+    def invalidate(self, name: str) -> None:
+        """Make the data class due on the next refresh."""
+        self._deadlines.pop(name, None)
+
+    def refreshed_at(self) -> dict[str, float]:
+        """Return the wall clock time of the last refresh of each data class."""
+        return dict(self._refreshed)
+
+    def restore(self, refreshed: dict[str, float]) -> None:
+        """Reschedule data classes refreshed before a restart."""
+        now = time.time()
+        for name, timestamp in refreshed.items():
+            if name not in self._intervals:
+                continue
+            remaining = self._intervals[name] - (now - timestamp)
+            if remaining > 0:
+                self._deadlines[name] = time.monotonic() + remaining
+                self._refreshed[name] = timestamp
+
+    def next_refresh(self, name: str) -> float:
+        """Return the seconds left until the data class is due."""
+        return max(0.0, self._deadlines.get(name, 0.0) - time.monotonic())
+
+
+class IcaAdaptiveInterval:
+    """Polling interval that follows how actively the lists change.
+
+    While there was a change within the active period the shortest interval
+    is used. After that the interval doubles with every poll that finds
+    nothing new, up to the longest interval. Each interval is lengthened by
+    a random jitter of up to the given fraction, so that several accounts
+    started together do not keep polling in step.
+    """
+
+    def __init__(
+        self,
+        minimum: timedelta,
+        maximum: timedelta,
+        active_period: timedelta,
+        jitter: float = 0.0,
+    ) -> None:
+        """Initialize the interval at its shortest."""
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self._active_period: float = active_period.total_seconds()
+        self._jitter = jitter
+        self._current = minimum
+        self._last_activity: float | None = None
+
+    @property
+    def current(self) -> timedelta:
+        return self._current
+
+    def note_activity(self) -> None:
+        """Record a change of the lists, made here or elsewhere."""
+        self._last_activity = time.monotonic()
+
+    def next_interval(self, changed: bool) -> timedelta:
+        """Return the interval until the next poll, after a poll."""
+        if changed:
+            self.note_activity()
+        if (
+            self._last_activity is not None
+            and time.monotonic() - self._last_activity < self._active_period
+        ):
+            self._current = self.minimum
+        else:
+            self._current = min(self.maximum, self._current * 2)
+        return self._current * random.uniform(1.0, 1.0 + self._jitter)
+
+
+class IcaBackoff:
+    """Exponential backoff with jitter, kept per key.
+
+    Each retry of a key waits twice as long as the one before, up to the
+    maximum. The delay is randomized between half and all of that, so keys
+    that failed together do not retry together.
+    """
+
+    def __init__(self, minimum: timedelta, maximum: timedelta) -> None:
+        """Initialize the backoff."""
+        self._minimum: float = minimum.total_seconds()
+        self._maximum: float = maximum.total_seconds()
+        self._attempts: dict[str, int] = {}
+
+    def next_delay(self, key: str) -> float:
+        """Return the seconds to wait before the next attempt of a key."""
+        attempts = self._attempts.get(key, 0)
+        self._attempts[key] = attempts + 1
+        delay = min(self._maximum, self._minimum * 2**attempts)
+        return random.uniform(delay / 2, delay)
+
+    def attempts(self, key: str) -> int:
+        """Return the number of retries since the key last succeeded."""
+        return self._attempts.get(key, 0)
+
+    def reset(self, key: str) -> None:
+        """Start over with the shortest delay for a key."""
+        self._attempts.pop(key, None)
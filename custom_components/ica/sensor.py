@@ -0,0 +1,175 @@
+"""Sensors for the random ICA recipes and diagnostics of the API usage."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfInformation, UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import CONF_NUM_RECIPES, DOMAIN
+from .coordinator import IcaCoordinator
+from .stats import IcaRequestStats
+
+
+@dataclass(frozen=True, kw_only=True)
+class IcaSensorEntityDescription(SensorEntityDescription):
+    """Describes an ICA diagnostic sensor."""
+
+    value_fn: Callable[[IcaRequestStats], Any] = lambda stats: None
+    attributes_fn: Callable[[IcaRequestStats], dict[str, Any]] | None = None
+
+
+SENSORS: tuple[IcaSensorEntityDescription, ...] = (
+    IcaSensorEntityDescription(
+        key="refresh_duration",
+        name="Refresh duration",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=0,
+        value_fn=lambda stats: stats.last_refresh_ms,
+        attributes_fn=lambda stats: {
+            "mean_ms": round(stats.refreshes.mean_ms, 1),
+            "max_ms": round(stats.refreshes.max_ms, 1),
+            "failed": stats.failed_refreshes,
+        },
+    ),
+    IcaSensorEntityDescription(
+        key="requests",
+        name="API requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.requests,
+        attributes_fn=lambda stats: {
+            name: f"{x.requests} requests, {x.errors} errors, "
+            f"{x.latency.mean_ms:.0f} ms mean"
+            for name, x in sorted(stats.endpoints.items())
+        },
+    ),
+    IcaSensorEntityDescription(
+        key="errors",
+        name="API errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.errors,
+    ),
+    IcaSensorEntityDescription(
+        key="bytes_in",
+        name="API data received",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.bytes_in,
+    ),
+    IcaSensorEntityDescription(
+        key="bytes_out",
+        name="API data sent",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.bytes_out,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+) -> None:
+    """Set up the ICA recipe and diagnostic sensors."""
+    coordinator: IcaCoordinator = hass.data[DOMAIN][entry.entry_id]
+    entities: list[SensorEntity] = [
+        IcaDiagnosticSensor(coordinator, entry.entry_id, description)
+        for description in SENSORS
+    ]
+    if entry.data.get(CONF_NUM_RECIPES):
+        entities.append(IcaRecipesSensor(coordinator, entry.entry_id))
+    async_add_entities(entities)
+
+
+class IcaRecipesSensor(CoordinatorEntity[IcaCoordinator], SensorEntity):
+    """A sensor listing the random recipes of the current rotation.
+
+    The ingredients are left out of the attributes; the recipe Id can be
+    passed to the add_items service to add them to a shopping list.
+    """
+
+    _attr_icon = "mdi:chef-hat"
+
+    def __init__(self, coordinator: IcaCoordinator, config_entry_id: str) -> None:
+        """Initialize IcaRecipesSensor."""
+        super().__init__(coordinator=coordinator)
+        self._attr_unique_id = f"{config_entry_id}-recipes"
+        self._attr_name = "ICA Recipes"
+
+    @property
+    def available(self) -> bool:
+        """Recipes are shown as long as there are any."""
+        return bool(self.coordinator.recipes)
+
+    @property
+    def native_value(self) -> str | None:
+        """Return the title of the first recipe."""
+        recipes = self.coordinator.recipes
+        return recipes[0]["Title"] if recipes else None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return a summary of every recipe."""
+        return {
+            "recipes": [
+                {
+                    "id": x["Id"],
+                    "title": x["Title"],
+                    "image_id": x.get("ImageId"),
+                    "cooking_time": x.get("CookingTime"),
+                    "portions": x.get("Portions"),
+                    "difficulty": x.get("Difficulty"),
+                }
+                for x in self.coordinator.recipes
+            ]
+        }
+
+
+class IcaDiagnosticSensor(CoordinatorEntity[IcaCoordinator], SensorEntity):
+    """A sensor exposing statistics of the ICA API usage."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    entity_description: IcaSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: IcaCoordinator,
+        config_entry_id: str,
+        description: IcaSensorEntityDescription,
+    ) -> None:
+        """Initialize IcaDiagnosticSensor."""
+        super().__init__(coordinator=coordinator)
+        self.entity_description = description
+        self._attr_unique_id = f"{config_entry_id}-{description.key}"
+        self._attr_name = f"ICA {description.name}"
+
+    @property
+    def available(self) -> bool:
+        """Statistics are available even when the last refresh failed."""
+        return True
+
+    @property
+    def native_value(self) -> Any:
+        """Return the current value of the statistic."""
+        return self.entity_description.value_fn(self.coordinator.api.stats)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return details of the statistic."""
+        if self.entity_description.attributes_fn is None:
+            return None
+        return self.entity_description.attributes_fn(self.coordinator.api.stats)
@@ -0,0 +1,119 @@
+"""Ordering of shopping list rows and the row changes of a move."""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from typing import Any
+
+from .icatypes import IcaProductCategory, IcaShoppingListEntry
+
+
+def article_group_ranks(
+    categories: Iterable[IcaProductCategory] | None,
+) -> dict[int, int]:
+    """Return the position of every article group in the store.
+
+    Top level categories keep the order of the API and each is followed by
+    its subcategories, in the same order.
+    """
+    children: dict[int | None, list[int]] = {}
+    for category in categories or []:
+        if category.get("Id") is not None:
+            parent = category.get("ParentId") or None
+            children.setdefault(parent, []).append(category["Id"])
+
+    ranks: dict[int, int] = {}
+    stack = list(reversed(children.get(None, [])))
+    while stack:
+        group = stack.pop()
+        if group in ranks:
+            continue
+        ranks[group] = len(ranks)
+        stack.extend(reversed(children.get(group, [])))
+    # Subcategories whose parent is unknown go after the known ones
+    for groups in children.values():
+        for group in groups:
+            ranks.setdefault(group, len(ranks))
+    return ranks
+
+
+def _order(row: IcaShoppingListEntry) -> float:
+    # Rows created locally have no InternalOrder yet and go last
+    order = row.get("InternalOrder")
+    return float("inf") if order is None else order
+
+
+def sort_rows(
+    rows: Iterable[IcaShoppingListEntry], ranks: dict[int, int] | None = None
+) -> list[IcaShoppingListEntry]:
+    """Sort rows by InternalOrder, within their article group if ranks are given."""
+    if ranks is None:
+        return sorted(rows, key=_order)
+    unknown = len(ranks)
+    return sorted(
+        rows,
+        key=lambda x: (ranks.get(x.get("ArticleGroupId"), unknown), _order(x)),
+    )
+
+
+def move_changes(
+    rows: list[IcaShoppingListEntry],
+    offline_id: str,
+    previous_id: str | None,
+    by_group: bool = False,
+) -> list[dict[str, Any]]:
+    """Return the row changes that move a row after another, or first.
+
+    rows are in the order they are shown. Only the moved row gets a new
+    InternalOrder if there is room for it, otherwise the rows after it are
+    pushed down until there is. In a list sorted by article group, a row
+    moved next to rows of another group joins that group. Raises ValueError
+    if previous_id is given but not in rows.
+    """
+    moved = next(x for x in rows if x["OfflineId"] == offline_id)
+    others = [x for x in rows if x is not moved]
+    changes: dict[str, dict[str, Any]] = {}
+
+    def change(row: IcaShoppingListEntry, **fields: Any) -> None:
+        changes.setdefault(row["OfflineId"], {"OfflineId": row["OfflineId"]})
+        changes[row["OfflineId"]].update(fields)
+
+    previous = None
+    if previous_id is not None:
+        previous = next((x for x in others if x["OfflineId"] == previous_id), None)
+        if previous is None:
+            raise ValueError(f"Row {previous_id} is not in the list.")
+    neighbour = previous or next(iter(others), None)
+    if by_group and neighbour is not None:
+        group = neighbour.get("ArticleGroupId")
+        if group != moved.get("ArticleGroupId"):
+            change(moved, ArticleGroupId=group)
+
+    sequence = sorted(others, key=_order)
+    position = sequence.index(previous) + 1 if previous is not None else 0
+    orders = [x.get("InternalOrder") for x in sequence]
+    if None in orders:
+        # Without a complete order every row is numbered from the top
+        sequence.insert(position, moved)
+        for n, row in enumerate(sequence):
+            if row.get("InternalOrder") != n:
+                change(row, InternalOrder=n)
+        return list(changes.values())
+
+    lower = orders[position - 1] if position > 0 else None
+    upper = orders[position] if position < len(orders) else None
+    if lower is None:
+        order = 0 if upper is None else max(upper - 1, 0)
+    elif upper is None or upper - lower > 1:
+        order = lower + 1 if upper is None else (lower + upper) // 2
+    else:
+        order = lower + 1
+    if order != moved.get("InternalOrder"):
+        change(moved, InternalOrder=order)
+
+    last = order
+    for row in sequence[position:]:
+        if row["InternalOrder"] > last:
+            break
+        last += 1
+        change(row, InternalOrder=last)
+    return list(changes.values())
@@ -0,0 +1,143 @@
+"""Request and refresh statistics for the ICA API."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+import re
+from typing import Any
+from urllib.parse import urlsplit
+
+# Upper bounds in milliseconds of the latency histogram buckets
+LATENCY_BUCKETS: tuple[float, ...] = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F-]{32,36})$")
+
+
+def endpoint_name(method: str, url: str) -> str:
+    """Return a label for a request with ids replaced, e.g. 'GET stores/{}'."""
+    path = urlsplit(url).path
+    if (index := path.find("/api/")) >= 0:
+        path = path[index + len("/api/") :]
+    segments = ["{}" if _ID_SEGMENT.match(x) else x for x in path.split("/")]
+    return f"{method} {'/'.join(segments)}"
+
+
+@dataclass
+class LatencyHistogram:
+    """Counts of durations per bucket, plus their sum and maximum."""
+
+    buckets: list[int] = field(
+        default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1)
+    )
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def add(self, duration_ms: float) -> None:
+        self.buckets[bisect_left(LATENCY_BUCKETS, duration_ms)] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        labels = [f"<={x:g}" for x in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]:g}"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.mean_ms, 1),
+            "max_ms": round(self.max_ms, 1),
+            "buckets_ms": dict(zip(labels, self.buckets)),
+        }
+
+
+@dataclass
+class EndpointStats:
+    """Statistics of the requests to one endpoint."""
+
+    requests: int = 0
+    errors: int = 0
+    not_modified: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "not_modified": self.not_modified,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "latency": self.latency.as_dict(),
+        }
+
+
+class IcaRequestStats:
+    """Collect per-endpoint request statistics and refresh durations."""
+
+    def __init__(self) -> None:
+        self.endpoints: dict[str, EndpointStats] = {}
+        self.refreshes = LatencyHistogram()
+        self.failed_refreshes: int = 0
+        self.last_refresh_ms: float | None = None
+
+    def record_request(
+        self,
+        method: str,
+        url: str,
+        duration_ms: float,
+        bytes_in: int = 0,
+        bytes_out: int = 0,
+        error: bool = False,
+        not_modified: bool = False,
+    ) -> None:
+        """Record one HTTP request."""
+        stats = self.endpoints.setdefault(endpoint_name(method, url), EndpointStats())
+        stats.requests += 1
+        stats.errors += error
+        stats.not_modified += not_modified
+        stats.bytes_in += bytes_in
+        stats.bytes_out += bytes_out
+        stats.latency.add(duration_ms)
+
+    def record_refresh(self, duration_ms: float, success: bool) -> None:
+        """Record one coordinator refresh."""
+        self.refreshes.add(duration_ms)
+        self.failed_refreshes += not success
+        self.last_refresh_ms = duration_ms
+
+    @property
+    def requests(self) -> int:
+        return sum(x.requests for x in self.endpoints.values())
+
+    @property
+    def errors(self) -> int:
+        return sum(x.errors for x in self.endpoints.values())
+
+    @property
+    def bytes_in(self) -> int:
+        return sum(x.bytes_in for x in self.endpoints.values())
+
+    @property
+    def bytes_out(self) -> int:
+        return sum(x.bytes_out for x in self.endpoints.values())
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return all statistics as plain data."""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "refresh": {
+                **self.refreshes.as_dict(),
+                "failed": self.failed_refreshes,
+                "last_ms": self.last_refresh_ms,
+            },
+            "endpoints": {
+                name: stats.as_dict() for name, stats in sorted(self.endpoints.items())
+            },
+        }
@@ -3,6 +3,9 @@
 import asyncio
 import datetime
 from typing import Any, cast
+import uuid
+
+import voluptuous as vol
 
 from homeassistant.components.todo import (
     TodoItem,
@@ -12,13 +15,24 @@ from homeassistant.components.todo import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import config_validation as cv, entity_platform
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN
+from .const import ATTR_ITEMS, ATTR_RECIPE_ID, DOMAIN, SERVICE_ADD_ITEMS
 from .coordinator import IcaCoordinator
-from .icatypes import IcaShoppingList
+from .icatypes import IcaRecipe, IcaShoppingList, IcaShoppingListEntry
+
+ADD_ITEMS_SCHEMA = vol.All(
+    cv.make_entity_service_schema(
+        {
+            vol.Optional(ATTR_ITEMS): vol.All(cv.ensure_list, [cv.string]),
+            vol.Optional(ATTR_RECIPE_ID): vol.Coerce(int),
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_ITEMS, ATTR_RECIPE_ID),
+)
 
 
 async def async_setup_entry(
@@ -34,6 +48,11 @@ async def async_setup_entry(
         for shopping_list in shopping_lists
     )
 
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        SERVICE_ADD_ITEMS, ADD_ITEMS_SCHEMA, "async_add_items"
+    )
+
 
 def _task_api_data(item: TodoItem) -> dict[str, Any]:
     """Convert a TodoItem to the set of add or update arguments."""
@@ -53,6 +72,21 @@ def _task_api_data(item: TodoItem) -> dict[str, Any]:
     return item_data
 
 
+def _recipe_ingredients(recipe: IcaRecipe) -> list[str]:
+    """Return the names of the ingredients of a recipe."""
+    return [
+        name
+        for group in recipe["IngredientGroups"] or []
+        for ingredient in group["Ingredients"] or []
+        if (name := ingredient.get("Ingredient") or ingredient.get("Text"))
+    ]
+
+
+def _row_key(task: IcaShoppingListEntry, description: str | None) -> tuple:
+    """Return the fields of a row that are shown in its TodoItem."""
+    return (task["OfflineId"], task["ProductName"], task["IsStrikedOver"], description)
+
+
 class IcaShoppingListEntity(CoordinatorEntity[IcaCoordinator], TodoListEntity):
     """A ICA shopping list TodoListEntity."""
 
@@ -76,96 +110,143 @@ class IcaShoppingListEntity(CoordinatorEntity[IcaCoordinator], TodoListEntity):
         self._attr_unique_id = f"{config_entry_id}-{shopping_list_id}"
         self._attr_name = shopping_list_name
         self._attr_icon = "icon.png"
+        self._fingerprint: tuple | None = None
+        self._items: dict[tuple, TodoItem] = {}
 
     @callback
     def _handle_coordinator_update(self) -> None:
-        """Handle updated data from the coordinator."""
+        """Handle updated data from the coordinator.
+
+        The state is only written when the rows, their order, the offers they
+        match or the list's availability changed. Items of unchanged rows are
+        reused.
+        """
         shopping_list = self.coordinator.get_shopping_list(self._project_id)
-        items = []
-        for task in shopping_list["Rows"]:
-            items.append(
-                TodoItem(
-                    summary=task["ProductName"],
-                    uid=task["OfflineId"],
-                    status=TodoItemStatus.COMPLETED
-                    if task["IsStrikedOver"]
-                    else TodoItemStatus.NEEDS_ACTION,
-                    description="Beskrivningen...",
-                )
+        if shopping_list is None:
+            # The list was deleted, show the entity as unavailable
+            if self._fingerprint is not None:
+                self._fingerprint = None
+                super()._handle_coordinator_update()
+            return
+        stale = self.coordinator.is_shopping_list_stale(shopping_list)
+        rows = self.coordinator.get_sorted_rows(shopping_list)
+        keys = tuple(
+            _row_key(task, self.coordinator.get_row_description(task))
+            for task in rows
+        )
+        fingerprint = (keys, stale, self.coordinator.last_update_success)
+        if fingerprint == self._fingerprint:
+            return
+
+        items: dict[tuple, TodoItem] = {}
+        for key, task in zip(keys, rows):
+            items[key] = self._items.get(key) or TodoItem(
+                summary=task["ProductName"],
+                uid=task["OfflineId"],
+                status=TodoItemStatus.COMPLETED
+                if task["IsStrikedOver"]
+                else TodoItemStatus.NEEDS_ACTION,
+                description=key[3],
             )
-        self._attr_todo_items = items
+        self._items = items
+        self._fingerprint = fingerprint
+        self._attr_todo_items = list(items.values())
+        self._attr_extra_state_attributes = {
+            "stale": stale or not self.coordinator.last_update_success
+        }
         super()._handle_coordinator_update()
 
+    @property
+    def available(self) -> bool:
+        """Return True while there is data for the list, even if it is stale."""
+        return self.coordinator.get_shopping_list(self._project_id) is not None
+
+    def _get_shopping_list(self) -> IcaShoppingList:
+        """Return the list of the entity, which must still exist to be edited."""
+        shopping_list = self.coordinator.get_shopping_list(self._project_id)
+        if shopping_list is None:
+            raise ValueError(f"Shopping list {self._attr_name} no longer exists.")
+        return shopping_list
+
     async def async_create_todo_item(self, item: TodoItem) -> None:
         """Create a To-do item."""
         if item.status != TodoItemStatus.NEEDS_ACTION:
             raise ValueError("Only active tasks may be created.")
-        articleGroup = self.coordinator.get_article_group(item.summary)
-        shopping_list = self.coordinator.get_shopping_list(self._project_id)
+        shopping_list = self._get_shopping_list()
+        await self.coordinator.async_create_row(
+            shopping_list, self._new_row(item.summary)
+        )
 
-        stuff = {
-            "ProductName": item.summary,
+    def _new_row(self, productName: str) -> IcaShoppingListEntry:
+        return {
+            "ProductName": productName,
             "SourceId": -1,
             "IsStrikedOver": False,
-            "ArticleGroupId": articleGroup,
+            "ArticleGroupId": self.coordinator.get_article_group(productName),
+            "OfflineId": str(uuid.uuid4()),
         }
-        if "CreatedRows" not in shopping_list:
-            shopping_list["CreatedRows"] = []
-        shopping_list["CreatedRows"].append(stuff)
 
-        shopping_list["LatestChange"] = (
-            datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
-        )
-        await self.coordinator.api.sync_shopping_list(shopping_list)
-        await self.coordinator.async_refresh()
+    async def async_add_items(
+        self, items: list[str] | None = None, recipe_id: int | None = None
+    ) -> None:
+        """Add many items, or the ingredients of a recipe, in one sync.
+
+        Items already on the list and not checked off are skipped.
+        """
+        names = list(items or [])
+        if recipe_id is not None:
+            recipe = await self.coordinator.async_get_recipe(recipe_id)
+            names.extend(_recipe_ingredients(recipe))
+
+        shopping_list = self._get_shopping_list()
+        seen = {
+            row["ProductName"].casefold()
+            for row in shopping_list["Rows"] or []
+            if row["ProductName"] and not row["IsStrikedOver"]
+        }
+        rows = []
+        for name in map(str.strip, names):
+            if name and name.casefold() not in seen:
+                seen.add(name.casefold())
+                rows.append(self._new_row(name))
+        if rows:
+            await self.coordinator.async_create_rows(shopping_list, rows)
 
     async def async_update_todo_item(self, item: TodoItem) -> None:
         """Update a To-do item."""
-        shopping_list = self.coordinator.get_shopping_list(self._project_id)
-
-        if "ChangedRows" not in shopping_list:
-            shopping_list["ChangedRows"] = []
-
-        shopping_list["ChangedRows"].append(
-            {
-                "OfflineId": item.uid,
-                "IsStrikedOver": item.status == TodoItemStatus.COMPLETED,
-                "SourceId": -1,
-            }
-        )
-        # if item.status is not None:
-        #    if item.status == TodoItemStatus.COMPLETED:
-        #        await self.coordinator.api.close_task(task_id=uid)
-        #    else:
-        #        await self.coordinator.api.reopen_task(task_id=uid)
-
-        await self.coordinator.api.sync_shopping_list(shopping_list)
-        await self.coordinator.async_refresh()
+        shopping_list = self._get_shopping_list()
+        row = self.coordinator.get_row(shopping_list, item.uid)
+        if row is None:
+            raise ValueError(f"Item {item.uid} is not in {shopping_list['Title']}.")
+
+        changes = {
+            "OfflineId": item.uid,
+            "IsStrikedOver": item.status == TodoItemStatus.COMPLETED,
+            "SourceId": -1,
+        }
+        if item.summary and item.summary != row["ProductName"]:
+            changes["ProductName"] = item.summary
+        await self.coordinator.async_change_row(shopping_list, changes)
 
     async def async_delete_todo_items(self, uids: list[str]) -> None:
         """Delete a To-do item."""
-        # await asyncio.gather(
-        #     *[self.coordinator.api.remove_from_list(task_id=uid) for uid in uids]
-        # )
-        shopping_list = self.coordinator.get_shopping_list(self._project_id)
-
-        if "DeletedRows" not in shopping_list:
-            shopping_list["DeletedRows"] = []
-
-        # shopping_list["DeletedRows"].extend(list(deleted_ids))
-        shopping_list["DeletedRows"].extend(uids)
-
-        await self.coordinator.api.sync_shopping_list(shopping_list)
-        await self.coordinator.async_refresh()
+        shopping_list = self._get_shopping_list()
+        for uid in uids:
+            if self.coordinator.get_row(shopping_list, uid) is None:
+                raise ValueError(f"Item {uid} is not in {shopping_list['Title']}.")
+        await self.coordinator.async_delete_rows(shopping_list, uids)
 
     async def async_move_todo_item(self, uid: str, previous_uid: str | None) -> None:
         """Move a To-do item."""
-        # await asyncio.gather(
-        #     *[self.coordinator.api.remove_from_list(task_id=uid) for uid in uids]
-        # )
-        shopping_list = self.coordinator.get_shopping_list(self._project_id)
-        await self.coordinator.api.sync_shopping_list(shopping_list)
-        await self.coordinator.async_refresh()
+        shopping_list = self._get_shopping_list()
+        for item_uid in (uid, previous_uid):
+            if item_uid is not None and (
+                self.coordinator.get_row(shopping_list, item_uid) is None
+            ):
+                raise ValueError(
+                    f"Item {item_uid} is not in {shopping_list['Title']}."
+                )
+        await self.coordinator.async_move_row(shopping_list, uid, previous_uid)
 
     async def async_added_to_hass(self) -> None:
         """When entity is added to hass update state from existing coordinator data."""